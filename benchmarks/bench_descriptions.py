@@ -0,0 +1,57 @@
+"""Benchmark rendering observation descriptions.
+
+Run from the top of the repo:
+
+    python -m benchmarks.bench_descriptions
+"""
+from timeit import timeit
+
+import html2markdown
+
+from inatcog.descriptions import render_description
+
+NUMBER = 100
+
+# Descriptions shaped like those seen on observations: short notes, field
+# notes with markup & links, and long pasted reports.
+SAMPLES = {
+    "short": "Found under a log near the creek.",
+    "field notes": (
+        "<p>Seen foraging in <strong>mixed flock</strong> with chickadees.</p>"
+        "<ul><li>Temp: 12°C</li><li>Wind: light</li><li>Sky: overcast</li></ul>"
+        '<p>See <a href="https://www.inaturalist.org/guides/123">this guide</a> '
+        "for the key features &amp; similar species.</p>"
+    )
+    * 3,
+    "long report": (
+        "<p>Daily survey. Transect walked from the north gate to the "
+        "<em>old orchard</em>, noting all <a href='https://example.org/x'>"
+        "lepidoptera</a> on flowering plants.<br>Weather fair.</p>\n"
+    )
+    * 200,
+}
+
+
+def render_unbounded(html):
+    """Render the whole description, then trim it."""
+    text_description = html2markdown.convert(" " + html)
+    lines = text_description.split("\n", 11)
+    description = "\n> %s" % "\n> ".join(lines[:10])
+    if len(lines) > 10:
+        description += "\n> …"
+    if len(description) > 500:
+        description = description[:498] + "…"
+    return description
+
+
+def main():
+    """Run the benchmarks."""
+    for name, html in SAMPLES.items():
+        print(f"{name} ({len(html)} chars):")
+        for func in (render_unbounded, render_description):
+            elapsed = timeit(lambda: func(html), number=NUMBER)
+            print(f"  {func.__name__}: {elapsed / NUMBER * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Benchmark decoding observations with many identifications.
+
+Compares the eager decoding Obs was replaced with against decoding all
+fields lazily, and only the fields an image embed needs.
+
+Run from the top of the repo:
+
+    python -m benchmarks.bench_obs
+"""
+import re
+from time import perf_counter
+
+from inatcog.obs import get_obs_fields
+from inatcog.taxa import get_taxon_fields
+from inatcog.users import User
+
+IDENTS = 200
+PHOTOS = 10
+NUMBER = 1000
+
+
+def make_record():
+    """Make an observation record with many identifications & photos."""
+    ancestor_ids = list(range(1, 30))
+    taxon = {
+        "id": 30,
+        "name": "Genus species",
+        "preferred_common_name": "Some species",
+        "matched_term": "Genus species",
+        "rank": "species",
+        "ancestor_ids": ancestor_ids,
+        "observations_count": 1000,
+        "is_active": True,
+    }
+    return {
+        "id": 1,
+        "taxon": taxon,
+        "community_taxon": taxon,
+        "ident_taxon_ids": ancestor_ids + [30],
+        "identifications": [
+            {
+                "current": True,
+                "taxon": {
+                    "id": 30 + i % 2,
+                    "ancestor_ids": ancestor_ids + [30][: i % 2],
+                },
+            }
+            for i in range(IDENTS)
+        ],
+        "user": {
+            "id": 1,
+            "name": "Some One",
+            "login": "someone",
+            "observations_count": 1,
+            "identifications_count": 1,
+        },
+        "photos": [
+            {"url": f"https://static.inaturalist.org/photos/{i}/square.jpg"}
+            for i in range(PHOTOS)
+        ],
+        "observed_on_string": "2020-05-01",
+        "place_guess": "Somewhere",
+        "quality_grade": "research",
+        "faves_count": 0,
+        "comments_count": 0,
+        "description": "",
+        "project_ids": [],
+    }
+
+
+def decode_eager(obs):
+    """Decode every field up front, as get_obs_fields did before Obs was lazy."""
+
+    def count_community_id(obs, community_taxon):
+        idents_count = 0
+        idents_agree = 0
+
+        ident_taxon_ids = obs["ident_taxon_ids"]
+
+        for identification in obs["identifications"]:
+            if identification["current"]:
+                user_taxon_id = identification["taxon"]["id"]
+                user_taxon_ids = identification["taxon"]["ancestor_ids"]
+                user_taxon_ids.append(user_taxon_id)
+                if community_taxon["id"] in user_taxon_ids:
+                    if user_taxon_id in ident_taxon_ids:
+                        idents_count += 1
+                        idents_agree += 1
+                else:
+                    idents_count += 1
+
+        return (idents_count, idents_agree)
+
+    obs_taxon = obs.get("taxon")
+    taxon = get_taxon_fields(obs_taxon) if obs_taxon else None
+    obs_community_taxon = obs.get("community_taxon")
+    idents_count = idents_agree = 0
+    if obs_community_taxon:
+        (idents_count, idents_agree) = count_community_id(obs, obs_community_taxon)
+        community_taxon = get_taxon_fields(obs_community_taxon)
+    else:
+        community_taxon = None
+    user = User.from_dict(obs["user"])
+    photos = obs.get("photos") or []
+    images = [re.sub("/square", "/original", photo.get("url")) for photo in photos]
+    thumbnail = photos[0].get("url") if photos else ""
+    sounds = obs.get("sounds")
+    if sounds:
+        sound = sounds[0].get("file_url")
+        sound_urls = [sound.get("file_url") for sound in sounds]
+    else:
+        sound = ""
+        sound_urls = []
+    return (
+        taxon,
+        community_taxon,
+        obs["id"],
+        user,
+        thumbnail,
+        images,
+        idents_agree,
+        idents_count,
+        obs["project_ids"],
+        sound,
+        sound_urls,
+    )
+
+
+def decode_all(record):
+    """Decode every field, as for a full observation embed."""
+    obs = get_obs_fields(record)
+    return (
+        obs.taxon,
+        obs.community_taxon,
+        obs.idents_count,
+        obs.user,
+        obs.images,
+        obs.project_ids,
+    )
+
+
+def decode_image(record):
+    """Decode only what an image embed needs."""
+    obs = get_obs_fields(record)
+    return (obs.obs_id, obs.images)
+
+
+def main():
+    """Run the benchmarks."""
+    for func in (decode_eager, decode_all, decode_image):
+        # A fresh record for each decode, as decode_eager changes the record:
+        records = [make_record() for _i in range(NUMBER)]
+        start = perf_counter()
+        for record in records:
+            func(record)
+        elapsed = perf_counter() - start
+        print(f"{func.__name__}: {elapsed / NUMBER * 1e6:.1f} µs per observation")
+
+
+if __name__ == "__main__":
+    main()
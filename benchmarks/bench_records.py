@@ -0,0 +1,56 @@
+"""Benchmark decoding user & observer stats records, as for list commands.
+
+Run from the top of the repo:
+
+    python -m benchmarks.bench_records
+"""
+from timeit import timeit
+
+from inatcog.projects import ObserverStats
+from inatcog.users import User
+
+RECORDS = 500
+NUMBER = 100
+
+
+def make_observers():
+    """Make a page of observers as from /v1/observations/observers."""
+    return [
+        {
+            "user_id": i,
+            "observation_count": 1000 - i,
+            "species_count": 100 - i % 100,
+            "user": {
+                "id": i,
+                "name": f"User {i}",
+                "login": f"user{i}",
+                "observations_count": 1000 - i,
+                "identifications_count": i,
+                "icon_url": None,
+                "orcid": None,
+            },
+        }
+        for i in range(RECORDS)
+    ]
+
+
+def decode_stats(observers):
+    """Decode observer stats, as for project stats."""
+    return [ObserverStats.from_dict(observer) for observer in observers]
+
+
+def decode_users(observers):
+    """Decode users, as for the user list."""
+    return [User.from_dict(observer["user"]) for observer in observers]
+
+
+def main():
+    """Run the benchmarks."""
+    observers = make_observers()
+    for func in (decode_stats, decode_users):
+        elapsed = timeit(lambda: func(observers), number=NUMBER)
+        print(f"{func.__name__}: {elapsed / NUMBER / RECORDS * 1e6:.2f} µs per record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark scanning chat messages for iNat links & triggers.
+
+Run from the top of the repo:
+
+    python -m benchmarks.bench_scanner
+"""
+import random
+import re
+from timeit import timeit
+
+from inatcog.obs import PAT_OBS_LINK
+from inatcog.scanner import scan_message
+from inatcog.taxa import PAT_TAXON_LINK
+
+DOT_TAXON_PAT = re.compile(r"(^|\s)\.(?P<query>[^\s\.].{2,}?[^\s\.])\.(\s|$)")
+NUMBER = 10
+
+# Messages shaped like a busy naturalist server: mostly chat, some links.
+CHAT = [
+    "lol",
+    "Good morning everyone!",
+    "Has anyone seen the new ID guide for sparrows? It's really helpful.",
+    "I went out to the marsh this morning. Lots of red-winged blackbirds.",
+    "That's a great photo, congrats on the lifer!",
+    "Thanks :)",
+    "I think it's a Cooper's hawk, not a sharp-shinned. Look at the tail.",
+    "Anyone going to the bioblitz this weekend?",
+    "ok",
+    "See you all later.",
+]
+LINKS = [
+    "What is this? https://www.inaturalist.org/observations/48394851",
+    "Check out https://www.inaturalist.org/taxa/9184-Zonotrichia-albicollis",
+    "obs 48394851",
+    "It's .rwbl. for sure.",
+    "My profile: https://inaturalist.ca/people/syntheticbee",
+]
+
+
+def make_corpus(size=10000, link_ratio=0.05):
+    """Make a corpus of mostly chat with some links & triggers."""
+    rand = random.Random(0)
+    return [
+        rand.choice(LINKS) if rand.random() < link_ratio else rand.choice(CHAT)
+        for _ in range(size)
+    ]
+
+
+def scan_separately(content):
+    """Scan as the listener did before: one pattern after another."""
+    return (
+        list(PAT_OBS_LINK.finditer(content)),
+        PAT_TAXON_LINK.search(content),
+        DOT_TAXON_PAT.search(content),
+    )
+
+
+def scan_combined(content):
+    """Scan in one pass."""
+    return scan_message(content, dot_taxon=True)
+
+
+def main():
+    """Run the benchmarks."""
+    corpus = make_corpus()
+    for func in (scan_separately, scan_combined):
+        elapsed = timeit(lambda: [func(msg) for msg in corpus], number=NUMBER)
+        per_msg = elapsed / NUMBER / len(corpus) * 1e6
+        print(f"{func.__name__}: {per_msg:.2f} µs per message")
+
+
+if __name__ == "__main__":
+    main()
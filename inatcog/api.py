@@ -1,6 +1,7 @@
 """Module to access iNaturalist API."""
+from contextlib import asynccontextmanager
 from time import time
-from typing import Union
+from typing import AsyncIterator, Iterable, Union
 import asyncio
 import aiohttp
 
@@ -21,6 +22,14 @@ WWW_URL_PAT = (
     r")"
     r")"
 )
+# Seconds between rate-limited requests. The hard upper limit is 100 per
+# minute after which they rate-limit, but the API doc requests that we
+# limit it to 60.
+REQUEST_INTERVAL = 1.0
+# Most requests fanned out by a command or reaction sent at once.
+MAX_CONCURRENT_REQUESTS = 4
+# Most user ids looked up in one bulk request.
+MAX_BULK_USERS = 100
 
 
 class INatAPI:
@@ -28,11 +37,37 @@ class INatAPI:
 
     def __init__(self):
         self.request_time = time()
+        self.request_lock = asyncio.Lock()
+        # Held while sending each of many requests fanned out at once:
+        self.request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
         self.places_cache = {}
         self.projects_cache = {}
         self.users_cache = {}
         self.session = aiohttp.ClientSession()
 
+    async def _throttle(self):
+        """Wait for the next request slot within the rate limit.
+
+        Slots are handed out in turn, so concurrent callers are spaced out
+        instead of all sending at once when the limit was last checked.
+        """
+        async with self.request_lock:
+            wait = self.request_time + REQUEST_INTERVAL - time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.request_time = time()
+
+    @asynccontextmanager
+    async def fan_out(self):
+        """Send one of many requests fanned out at once, within the rate limit.
+
+        At most MAX_CONCURRENT_REQUESTS are sent at once, and each waits its
+        turn within the rate limit (see `_throttle`).
+        """
+        async with self.request_slots:
+            await self._throttle()
+            yield
+
     async def get_taxa(self, *args, **kwargs):
         """Query API for taxa matching parameters."""
 
@@ -87,13 +122,10 @@ class INatAPI:
             if refresh_cache or place_id not in self.places_cache:
                 # Rate-limit these so they can be retrieved in a loop without tripping
                 # iNat API's rate-limiting.
-                time_since_request = time() - self.request_time
-                if time_since_request < 1.0:
-                    await asyncio.sleep(1.0 - time_since_request)
+                await self._throttle()
                 async with self.session.get(f"{API_BASE_URL}{request}") as response:
                     if response.status == 200:
                         self.places_cache[place_id] = await response.json()
-                        self.request_time = time()
             return (
                 self.places_cache[place_id] if place_id in self.places_cache else None
             )
@@ -181,21 +213,65 @@ class INatAPI:
             request = f"/v1/users/autocomplete?q={query}"
 
         if refresh_cache or query not in self.users_cache:
-            time_since_request = time() - self.request_time
-            # Limit to 60 requests every minute. Hard upper limit is 100 per minute
-            # after which they rate-limit, but the API doc requests that we
-            # limit it to 60.
             # TODO: generalize & apply to all requests.
             # TODO: provide means to expire the cache (other than reloading the cog).
-            if time_since_request < 1.0:
-                await asyncio.sleep(1.0 - time_since_request)
+            await self._throttle()
             async with self.session.get(f"{API_BASE_URL}{request}") as response:
                 if response.status == 200:
                     self.users_cache[query] = await response.json()
-                    self.request_time = time()
 
         return self.users_cache[query] if query in self.users_cache else None
 
+    async def get_users_by_ids(
+        self, user_ids: Iterable[int], refresh_cache=False
+    ) -> AsyncIterator[dict]:
+        """Get users for many ids, yielding each user record once resolved.
+
+        Cached users are yielded first. The rest are looked up in bulk as
+        observers, MAX_BULK_USERS at a time, and any not found that way (e.g.
+        users with no observations) are then looked up one by one,
+        concurrently, within the rate limit. Ids that can't be resolved are
+        skipped.
+        """
+        pending = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = None if refresh_cache else self.users_cache.get(user_id)
+            results = cached and cached.get("results")
+            if results:
+                yield results[0]
+            else:
+                pending.append(user_id)
+
+        missing = []
+        for start in range(0, len(pending), MAX_BULK_USERS):
+            batch = pending[start : start + MAX_BULK_USERS]
+            await self._throttle()
+            response = await self.get_observations(
+                "observers",
+                user_id=",".join(map(str, batch)),
+                per_page=len(batch),
+            )
+            found = {user["id"]: user for user in self._cache_observers(response)}
+            for user_id in batch:
+                if user_id in found:
+                    yield found[user_id]
+                else:
+                    missing.append(user_id)
+
+        tasks = [
+            asyncio.ensure_future(self.get_users(user_id, refresh_cache=True))
+            for user_id in missing
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                response = await task
+                results = response and response.get("results")
+                if results:
+                    yield results[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+
     async def get_observers_from_projects(self, project_ids: list):
         """Get observers for a list of project ids.
 
@@ -209,8 +285,12 @@ class INatAPI:
         response = await self.get_observations(
             "observers", project_id=",".join(map(str, project_ids))
         )
+        return self._cache_observers(response)
+
+    def _cache_observers(self, response):
+        """Cache the users from an observers response and return them."""
         users = []
-        results = response.get("results") or []
+        results = (response and response.get("results")) or []
         for observer in results:
             user = observer.get("user")
             if user:
@@ -221,5 +301,5 @@ class INatAPI:
                     user_json = {}
                     user_json["results"] = [user]
                     self.users_cache[user_id] = user_json
-
+                    users.append(user)
         return users
@@ -0,0 +1,255 @@
+"""Module for a local autocomplete index of taxon names."""
+from collections import Counter, OrderedDict
+import re
+from time import time
+from typing import Dict, Optional, Set
+
+from .taxa import get_match_patterns, score_match, Taxon
+
+# Tokens in names & queries, i.e. each word of a name may be prefix-matched.
+WORD_PAT = re.compile(r"[^\W_]+")
+# Taxa kept in the index; least recently used are evicted beyond this.
+MAX_INDEXED_TAXA = 5000
+# Seconds a taxon record is used before it is fetched again, as counts &
+# names shown for it may have changed.
+TAXON_INDEX_TTL = 60 * 60
+# Queries remembered with the taxon the API matched for them.
+MAX_CONFIRMED_QUERIES = 5000
+# Like match_taxon: a phrase or code match is an exact match.
+MIN_CONFIDENT_SCORE = 200
+
+
+def normalize(text: str):
+    """Lowercase words of text joined by single blanks."""
+    return " ".join(WORD_PAT.findall(text.lower()))
+
+
+def trigrams(text: str):
+    """Trigrams of normalized text."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class _TrieNode:
+    """Node of a prefix trie holding ids of taxa with words having the prefix."""
+
+    __slots__ = ("children", "taxon_ids")
+
+    def __init__(self):
+        self.children = {}
+        self.taxon_ids = set()
+
+
+class TaxonNameIndex:
+    """Local autocomplete index over taxa seen from /v1/taxa/autocomplete.
+
+    Every scientific name, common name and matched term is indexed in a
+    prefix trie by word (for query terms) and in a trigram index (for exact
+    phrases). A match is only returned when it is as good as what the API
+    would return:
+
+    - the same query previously matched the taxon via the API, or
+    - candidates scored with `score_match` have a single best exact match,
+      and the API has matched that taxon for some query before.
+
+    Otherwise the caller should fall through to the API. Records older than
+    the ttl are stale: the caller should fetch them again before use.
+    """
+
+    def __init__(self, max_taxa=MAX_INDEXED_TAXA, ttl=TAXON_INDEX_TTL):
+        self.max_taxa = max_taxa
+        self.ttl = ttl
+        self.taxa: Dict[int, Taxon] = OrderedDict()
+        self.updated: Dict[int, float] = {}
+        self.terms: Dict[int, Set[str]] = {}
+        self.trie = _TrieNode()
+        self.trigrams: Dict[str, Set[int]] = {}
+        self.confirmed = OrderedDict()
+        # Number of confirmed queries matching each taxon:
+        self.confirmed_ids = Counter()
+
+    def __len__(self):
+        return len(self.taxa)
+
+    @staticmethod
+    def query_key(query, ancestor_id=None):
+        """Key for remembering the API's match for a query."""
+        return (
+            normalize(" ".join(query.terms)),
+            tuple(normalize(" ".join(phrase)) for phrase in query.phrases),
+            tuple(sorted(query.ranks)),
+            ancestor_id,
+        )
+
+    def _names(self, taxon_id):
+        taxon = self.taxa[taxon_id]
+        names = {taxon.name, *self.terms[taxon_id]}
+        if taxon.common:
+            names.add(taxon.common)
+        return {normalize(name) for name in names}
+
+    def _index(self, taxon_id, names):
+        for name in names:
+            for word in name.split():
+                node = self.trie
+                for char in word:
+                    node = node.children.setdefault(char, _TrieNode())
+                    node.taxon_ids.add(taxon_id)
+            for trigram in trigrams(name):
+                self.trigrams.setdefault(trigram, set()).add(taxon_id)
+
+    def _unindex(self, taxon_id, names):
+        for name in names:
+            for word in name.split():
+                node = self.trie
+                path = []
+                for char in word:
+                    child = node.children.get(char)
+                    if not child:
+                        break
+                    child.taxon_ids.discard(taxon_id)
+                    path.append((node, char, child))
+                    node = child
+                for parent, char, child in reversed(path):
+                    if child.taxon_ids:
+                        break
+                    del parent.children[char]
+            for trigram in trigrams(name):
+                taxon_ids = self.trigrams.get(trigram)
+                if taxon_ids is not None:
+                    taxon_ids.discard(taxon_id)
+                    if not taxon_ids:
+                        del self.trigrams[trigram]
+
+    def add(self, taxon: Taxon):
+        """Add or update a taxon from an autocomplete result."""
+        taxon_id = taxon.taxon_id
+        if taxon_id in self.taxa:
+            old_names = self._names(taxon_id)
+            self.taxa.move_to_end(taxon_id)
+        else:
+            old_names = set()
+            self.terms[taxon_id] = set()
+        self.taxa[taxon_id] = taxon
+        self.updated[taxon_id] = time()
+        self.terms[taxon_id].add(taxon.term)
+        new_names = self._names(taxon_id)
+        self._unindex(taxon_id, old_names - new_names)
+        self._index(taxon_id, new_names - old_names)
+        while len(self.taxa) > self.max_taxa:
+            self.remove(next(iter(self.taxa)))
+
+    def remove(self, taxon_id: int):
+        """Remove a taxon from the index."""
+        if taxon_id not in self.taxa:
+            return
+        self._unindex(taxon_id, self._names(taxon_id))
+        del self.taxa[taxon_id]
+        del self.terms[taxon_id]
+        del self.updated[taxon_id]
+
+    def refresh(self, taxon: Taxon):
+        """Replace the record of an indexed taxon with a newly fetched one."""
+        indexed = self.taxa.get(taxon.taxon_id)
+        if indexed:
+            # Keep the term last matched, as records by id have none:
+            self.add(taxon._replace(term=indexed.term))
+
+    def is_stale(self, taxon_id: int):
+        """Return True if the taxon's record is older than the ttl."""
+        return time() - self.updated.get(taxon_id, 0) >= self.ttl
+
+    def confirm(self, query, taxon: Taxon, ancestor_id=None):
+        """Remember the taxon the API matched for the query."""
+        key = self.query_key(query, ancestor_id)
+        if key in self.confirmed:
+            self._unconfirm(self.confirmed[key][0])
+        self.confirmed[key] = (taxon.taxon_id, taxon.term)
+        self.confirmed.move_to_end(key)
+        self.confirmed_ids[taxon.taxon_id] += 1
+        while len(self.confirmed) > MAX_CONFIRMED_QUERIES:
+            (_key, (taxon_id, _term)) = self.confirmed.popitem(last=False)
+            self._unconfirm(taxon_id)
+
+    def _unconfirm(self, taxon_id):
+        self.confirmed_ids[taxon_id] -= 1
+        if not self.confirmed_ids[taxon_id]:
+            del self.confirmed_ids[taxon_id]
+
+    def prefix_ids(self, word: str):
+        """Ids of taxa with a word starting with the prefix."""
+        node = self.trie
+        for char in word:
+            node = node.children.get(char)
+            if not node:
+                return set()
+        return node.taxon_ids
+
+    def phrase_ids(self, phrase: str):
+        """Ids of taxa with a name that may contain the phrase."""
+        words = phrase.split()
+        if not words:
+            return set()
+        phrase_trigrams = trigrams(phrase)
+        if not phrase_trigrams:
+            return set.intersection(*(self.prefix_ids(word) for word in words))
+        return set.intersection(
+            *(self.trigrams.get(trigram, set()) for trigram in phrase_trigrams)
+        )
+
+    def candidates(self, query):
+        """Ids of taxa matching all terms & phrases of the query."""
+        candidate_sets = [
+            self.prefix_ids(word) for word in normalize(" ".join(query.terms)).split()
+        ]
+        candidate_sets += [
+            self.phrase_ids(normalize(" ".join(phrase))) for phrase in query.phrases
+        ]
+        if not candidate_sets:
+            return set()
+        return set.intersection(*candidate_sets)
+
+    def match(self, query, ancestor_id=None) -> Optional[Taxon]:
+        """Match a taxon for the query with confidence, if possible."""
+        if query.taxon_id:
+            return None
+
+        confirmed = self.confirmed.get(self.query_key(query, ancestor_id))
+        if confirmed:
+            taxon_id, term = confirmed
+            if taxon_id in self.taxa:
+                self.taxa.move_to_end(taxon_id)
+                return self.taxa[taxon_id]._replace(term=term)
+
+        (all_terms, exact) = get_match_patterns(query)
+        best_score = -1
+        best = []
+        for taxon_id in self.candidates(query):
+            taxon = self.taxa[taxon_id]
+            if query.ranks and taxon.rank not in query.ranks:
+                continue
+            if ancestor_id and ancestor_id not in taxon.ancestor_ids:
+                continue
+            # Score each term seen for the taxon as if returned by the API:
+            score, record = max(
+                (
+                    (score_match(query, record, all_terms, exact=exact), record)
+                    for record in (
+                        taxon._replace(term=term) for term in self.terms[taxon_id]
+                    )
+                ),
+                key=lambda scored: scored[0],
+            )
+            if score > best_score:
+                best_score = score
+                best = [record]
+            elif score == best_score:
+                best.append(record)
+
+        if (
+            best_score >= MIN_CONFIDENT_SCORE
+            and len(best) == 1
+            and best[0].taxon_id in self.confirmed_ids
+        ):
+            self.taxa.move_to_end(best[0].taxon_id)
+            return best[0]
+        return None
@@ -0,0 +1,81 @@
+"""Module to resolve 4-letter bird alpha codes to iNat taxa."""
+import asyncio
+import json
+from typing import Optional
+from redbot.core.data_manager import bundled_data_path
+from .common import LOG
+
+BIRD_CODES_FILE = "bird_codes.json"
+
+
+class INatBirdCodeTable:
+    """Local index of AOU/IBP 4-letter bird codes to iNat taxon ids.
+
+    The bundled data file maps each code to its scientific name. Taxon ids
+    are resolved from those names once (see `refresh`) or learned whenever
+    the API matches a code, and are kept in the cog's global config so that
+    code lookups need no API round trip to find the match.
+    """
+
+    def __init__(self, cog):
+        self.cog = cog
+        self.names = {}
+        self.taxon_ids = {}
+
+    async def load(self):
+        """Load bundled codes and resolved taxon ids."""
+        try:
+            path = bundled_data_path(self.cog) / BIRD_CODES_FILE
+            with open(path, encoding="utf-8") as codes_file:
+                self.names = json.load(codes_file)
+        except (FileNotFoundError, ValueError) as err:
+            LOG.error("Bird codes not loaded: %s", err)
+            self.names = {}
+        self.taxon_ids = await self.cog.config.bird_codes()
+
+    def get_taxon_id(self, code: str) -> Optional[int]:
+        """Get the taxon id for a code, if known."""
+        return self.taxon_ids.get(code.upper())
+
+    async def learn(self, code: str, taxon_id: int):
+        """Remember the taxon id matched for a code."""
+        code = code.upper()
+        if self.taxon_ids.get(code) == taxon_id:
+            return
+        self.taxon_ids[code] = taxon_id
+        await self.cog.config.bird_codes.set_raw(code, value=taxon_id)
+
+    async def resolve(self, code: str) -> Optional[int]:
+        """Resolve a bundled code to a taxon id via the API."""
+        name = self.names.get(code)
+        queries = [name, code] if name else [code]
+        for query in queries:
+            response = await self.cog.api.get_taxa(q=query, rank="species")
+            records = (response and response.get("results")) or []
+            for record in records:
+                if record.get("name") == name or record.get("matched_term") == code:
+                    return record["id"]
+        return None
+
+    async def refresh(self, refresh_all=False):
+        """Resolve taxon ids for bundled codes not yet known.
+
+        Returns
+        -------
+        tuple
+            Counts of (resolved, unresolved) codes.
+        """
+        resolved = unresolved = 0
+        for code in self.names:
+            if code in self.taxon_ids and not refresh_all:
+                continue
+            taxon_id = await self.resolve(code)
+            if taxon_id:
+                await self.learn(code, taxon_id)
+                resolved += 1
+            else:
+                LOG.info("Bird code not resolved: %s (%s)", code, self.names[code])
+                unresolved += 1
+            # Stay well within the API rate limit.
+            await asyncio.sleep(1.0)
+        return (resolved, unresolved)
@@ -12,12 +12,15 @@ def known_inat_user():
         cog = ctx.bot.get_cog("iNat")
         if not cog:
             return False
+        # Checks run before cog_before_invoke; registrations are loaded then:
+        await cog._ready_event.wait()
 
         user_config = None
-        try:
-            user_config = await cog.get_valid_user_config(ctx)
-        except LookupError:
-            pass
+        with cog.metrics.timer("check.known_inat_user"):
+            try:
+                user_config = await cog.get_valid_user_config(ctx)
+            except LookupError:
+                pass
         return bool(user_config)
 
     return commands.check(check)
@@ -0,0 +1,80 @@
+"""Module to render observation descriptions."""
+import asyncio
+from collections import OrderedDict
+import re
+
+import html2markdown
+
+# Most lines & characters of a description shown in an embed.
+MAX_DESCRIPTION_LINES = 10
+MAX_DESCRIPTION_CHARS = 500
+# Most characters of HTML converted; the rest could never be shown.
+MAX_DESCRIPTION_HTML = 2000
+# Convert HTML at least this long in a thread so the event loop isn't held up.
+OFFLOAD_DESCRIPTION_HTML = 1000
+# Descriptions rendered, keyed by observation id.
+MAX_CACHED_DESCRIPTIONS = 200
+
+# Match an incomplete tag or entity at the end of truncated HTML. A "<" not
+# followed by a tag name (e.g. "size <5cm") is text, so it is left alone.
+PAT_PARTIAL_MARKUP = re.compile(r"(<[a-zA-Z/!][^<>]*|&#?\w*)$")
+
+
+def truncate_html(html: str, max_chars: int = MAX_DESCRIPTION_HTML):
+    """Truncate HTML without breaking a tag or entity.
+
+    Unclosed elements are left for the parser to close.
+    """
+    if len(html) <= max_chars:
+        return html
+    return PAT_PARTIAL_MARKUP.sub("", html[:max_chars]) + "…"
+
+
+def render_description(html: str):
+    """Render description HTML as up to 10 lines of quoted markdown."""
+    # TODO: if https://bugs.launchpad.net/beautifulsoup/+bug/1873787 is
+    # ever fixed, suppress the warning instead of adding this blank
+    # as a workaround.
+    text_description = html2markdown.convert(" " + truncate_html(html))
+    lines = text_description.split("\n", MAX_DESCRIPTION_LINES + 1)
+    description = "\n> %s" % "\n> ".join(lines[:MAX_DESCRIPTION_LINES])
+    if len(lines) > MAX_DESCRIPTION_LINES:
+        description += "\n> …"
+    if len(description) > MAX_DESCRIPTION_CHARS:
+        description = description[: MAX_DESCRIPTION_CHARS - 2] + "…"
+    return description
+
+
+class RenderedDescriptions:
+    """Observation descriptions rendered for embeds, keyed by observation id.
+
+    A rendered description is kept until the observation's description
+    changes, or it is the least recently used of more than maxlen.
+    """
+
+    def __init__(self, maxlen=MAX_CACHED_DESCRIPTIONS):
+        self.maxlen = maxlen
+        self.rendered = OrderedDict()
+
+    def __len__(self):
+        return len(self.rendered)
+
+    async def format_description(self, obs):
+        """Format an observation's description for an embed."""
+        cached = self.rendered.get(obs.obs_id)
+        if cached and cached[0] == obs.description:
+            self.rendered.move_to_end(obs.obs_id)
+            return cached[1]
+
+        html = obs.description
+        if len(html) >= OFFLOAD_DESCRIPTION_HTML:
+            loop = asyncio.get_event_loop()
+            description = await loop.run_in_executor(None, render_description, html)
+        else:
+            description = render_description(html)
+
+        self.rendered[obs.obs_id] = (html, description)
+        self.rendered.move_to_end(obs.obs_id)
+        if len(self.rendered) > self.maxlen:
+            self.rendered.popitem(last=False)
+        return description
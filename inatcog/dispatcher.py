@@ -0,0 +1,139 @@
+"""Module to dispatch listener work to a bounded pool of workers."""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Hashable, Optional
+
+from .common import LOG
+
+# Workers running listener jobs concurrently.
+DISPATCH_WORKERS = 4
+# Most jobs queued per guild; the oldest is dropped to make room.
+MAX_GUILD_QUEUE = 20
+# Most detached jobs (e.g. prompts waiting for an answer) running at once.
+MAX_DETACHED = 20
+
+
+class WorkDispatcher:
+    """Run listener jobs from bounded per-guild queues on a pool of workers.
+
+    Guilds take turns, so a burst in one guild doesn't hold up the rest.
+    Submitting a job with the same key as one still queued replaces it
+    (e.g. a reaction toggled again before it was handled), and when a
+    guild's queue is full, its oldest job is dropped.
+
+    Jobs are callables returning an awaitable, so that a dropped or replaced
+    job never creates a coroutine. Jobs submitted before the workers are
+    started are queued until they are.
+    """
+
+    def __init__(self, metrics, workers=DISPATCH_WORKERS, max_queue=MAX_GUILD_QUEUE):
+        self.metrics = metrics
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queues = {}
+        self.keyed = {}
+        self.depth = 0
+        self._turns = deque()
+        self._pending = None
+        self._tasks = []
+        self._detached = set()
+
+    def start(self):
+        """Start the workers, first running any jobs already queued."""
+        self._pending = asyncio.Semaphore(self.depth)
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    def stop(self):
+        """Stop the workers, discarding queued jobs."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._pending = None
+        for task in self._detached:
+            task.cancel()
+        self._detached.clear()
+        self.queues.clear()
+        self.keyed.clear()
+        self._turns.clear()
+        self.depth = 0
+
+    def submit(
+        self,
+        guild_id: int,
+        job: Callable[[], Awaitable],
+        key: Optional[Hashable] = None,
+    ):
+        """Queue a job for a guild, replacing a queued job with the same key."""
+        self.metrics.incr("dispatch.submitted")
+        if key is not None:
+            entry = self.keyed.get((guild_id, key))
+            if entry:
+                entry[1] = job
+                self.metrics.incr("dispatch.coalesced")
+                return
+
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = self.queues[guild_id] = deque()
+            self._turns.append(guild_id)
+        entry = [key, job]
+        queue.append(entry)
+        if key is not None:
+            self.keyed[(guild_id, key)] = entry
+        if len(queue) > self.max_queue:
+            self._forget(guild_id, queue.popleft())
+            self.metrics.incr("dispatch.dropped")
+        else:
+            self.depth += 1
+            if self._pending:
+                self._pending.release()
+        self.metrics.gauge("dispatch.depth", self.depth)
+
+    def detach(self, job: Callable[[], Awaitable]):
+        """Run a job that mostly waits (e.g. for an answer) outside the pool.
+
+        Such jobs would otherwise hold a worker for as long as they wait.
+        Up to MAX_DETACHED run at once; more, or any before the workers are
+        started, are dropped.
+        """
+        if not self._tasks or len(self._detached) >= MAX_DETACHED:
+            self.metrics.incr("dispatch.dropped")
+            LOG.warning(
+                "Detached job dropped (%s)",
+                "full" if self._tasks else "dispatcher not started",
+            )
+            return
+        self.metrics.incr("dispatch.detached")
+        task = asyncio.ensure_future(self._run(job))
+        self._detached.add(task)
+        task.add_done_callback(self._detached.discard)
+
+    async def _run(self, job: Callable[[], Awaitable]):
+        try:
+            with self.metrics.timer("dispatch.job"):
+                await job()
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception("Exception in dispatched job")
+
+    def _forget(self, guild_id: int, entry: list):
+        key = entry[0]
+        if key is not None and self.keyed.get((guild_id, key)) is entry:
+            del self.keyed[(guild_id, key)]
+
+    def _next_job(self):
+        guild_id = self._turns.popleft()
+        queue = self.queues[guild_id]
+        entry = queue.popleft()
+        self._forget(guild_id, entry)
+        if queue:
+            self._turns.append(guild_id)
+        else:
+            del self.queues[guild_id]
+        self.depth -= 1
+        self.metrics.gauge("dispatch.depth", self.depth)
+        return entry[1]
+
+    async def _work(self):
+        while True:
+            await self._pending.acquire()
+            await self._run(self._next_job())
@@ -1,9 +1,8 @@
 """Module to handle iNat embed concerns."""
-from io import BytesIO
+import asyncio
 import re
 from typing import Union
 from discord import File
-import html2markdown
 from redbot.core.utils.menus import start_adding_reactions
 from .api import WWW_BASE_URL
 from .common import LOG
@@ -11,7 +10,8 @@ from .embeds import format_items_for_embed, make_embed
 from .interfaces import MixinMeta
 from .maps import INatMapURL
 from .obs import PAT_OBS_LINK
-from .projects import UserProject, ObserverStats
+from .projects import UserProject
+from .reactions import CountsEmbed, REACTION_EMOJIS
 from .taxa import (
     format_taxon_name,
     format_taxon_names,
@@ -21,8 +21,6 @@ from .taxa import (
     format_place_taxon_counts,
     format_user_taxon_counts,
     TAXON_ID_LIFE,
-    TAXON_COUNTS_HEADER,
-    TAXON_PLACES_HEADER,
 )
 
 
@@ -87,19 +85,14 @@ class INatEmbeds(MixinMeta):
 
     async def maybe_send_sound_url(self, channel, url):
         """Given a URL to a sound, send it if it can be retrieved."""
-        async with self.api.session.get(url) as response:
-            try:
-                sound = BytesIO(await response.read())
-            except OSError:
-                sound = None
+        sound = await self.sound_cache.get_sound(url)
         if sound:
-            filename = response.url.name.replace(".m4a", ".mp3")
-            await channel.send(file=File(sound, filename=filename))
+            (path, filename) = sound
+            await channel.send(file=File(str(path), filename=filename))
 
     async def make_obs_counts_embed(self, arg):
         """Return embed for observation counts from place or by user."""
         group_by_param = ""
-        formatted_counts = ""
 
         if isinstance(arg, FilteredTaxon):
             (taxon, user, place, group_by) = arg
@@ -111,35 +104,39 @@ class INatEmbeds(MixinMeta):
 
         title = format_taxon_title(taxon)
         full_title = f"Observations of {title}"
-        description = ""
+        counts = CountsEmbed(taxon.taxon_id)
         if place and user:
             if group_by == "user":
                 full_title = f"Observations of {title} by {user.login}"
                 group_by_param = f"&user_id={user.user_id}"
+                counts.user_id = user.user_id
                 formatted_counts = await format_place_taxon_counts(
                     self, place, taxon, user.user_id
                 )
-                header = TAXON_PLACES_HEADER
+                if formatted_counts:
+                    counts.places[place.place_id] = formatted_counts
             else:
                 full_title = f"Observations of {title} from {place.display_name}"
                 group_by_param = f"&place_id={place.place_id}"
+                counts.place_id = place.place_id
                 formatted_counts = await format_user_taxon_counts(
                     self, user, taxon, place.place_id
                 )
-                header = TAXON_COUNTS_HEADER
+                if formatted_counts:
+                    counts.users[user.login] = formatted_counts
         elif user:
             formatted_counts = await format_user_taxon_counts(self, user, taxon)
-            header = TAXON_COUNTS_HEADER
+            if formatted_counts:
+                counts.users[user.login] = formatted_counts
         elif place:
             formatted_counts = await format_place_taxon_counts(self, place, taxon)
-            header = TAXON_PLACES_HEADER
-        if formatted_counts:
-            description = f"\n{header}\n{formatted_counts}"
+            if formatted_counts:
+                counts.places[place.place_id] = formatted_counts
 
         embed = make_embed(
             url=f"{WWW_BASE_URL}/observations?taxon_id={taxon.taxon_id}{group_by_param}",
             title=full_title,
-            description=description,
+            description=counts.render(),
         )
         return embed
 
@@ -176,7 +173,7 @@ class INatEmbeds(MixinMeta):
                 title += format_count("comment", obs.comments_count)
             return title
 
-        def format_summary(user, obs):
+        async def format_summary(user, obs):
             summary = "Observed by " + user.profile_link()
             if obs.obs_on:
                 summary += " on " + obs.obs_on
@@ -185,18 +182,7 @@ class INatEmbeds(MixinMeta):
             if obs.description:
                 # Contribute up to 10 lines from the description, and no more
                 # than 500 characters:
-                #
-                # TODO: if https://bugs.launchpad.net/beautifulsoup/+bug/1873787 is
-                # ever fixed, suppress the warning instead of adding this blank
-                # as a workaround.
-                text_description = html2markdown.convert(" " + obs.description)
-                lines = text_description.split("\n", 11)
-                description = "\n> %s" % "\n> ".join(lines[:10])
-                if len(lines) > 10:
-                    description += "\n> …"
-                if len(description) > 500:
-                    description = description[:498] + "…"
-                summary += description + "\n"
+                summary += await self.descriptions.format_description(obs) + "\n"
             return summary
 
         def format_community_id(title, summary, obs):
@@ -257,7 +243,7 @@ class INatEmbeds(MixinMeta):
                 embed.url = url
             else:
                 title = format_title(taxon, obs)
-                summary = format_summary(user, obs)
+                summary = await format_summary(user, obs)
                 title, summary = format_community_id(title, summary, obs)
                 title = format_media_counts(title, obs)
 
@@ -354,7 +340,7 @@ class INatEmbeds(MixinMeta):
         embed = make_embed(url=f"{WWW_BASE_URL}/taxa/{taxon.taxon_id}")
         p = self.p  # pylint: disable=invalid-name
 
-        async def format_description(rec):
+        async def format_taxon_description(rec):
             obs_cnt = rec.observations
             url = f"{WWW_BASE_URL}/observations?taxon_id={rec.taxon_id}&verifiable=any"
             obs_fmt = "[%d](%s)" % (obs_cnt, url)
@@ -374,19 +360,20 @@ class INatEmbeds(MixinMeta):
             return description
 
         title = format_taxon_title(taxon)
-        description = await format_description(taxon)
+        description = await format_taxon_description(taxon)
         description = await format_ancestors(description, taxon)
+        counts = CountsEmbed(taxon.taxon_id, head=description)
         if place:
             formatted_counts = await format_place_taxon_counts(self, place, taxon)
             if formatted_counts:
-                description += f"\n{TAXON_PLACES_HEADER}\n{formatted_counts}"
+                counts.places[place.place_id] = formatted_counts
         if user:
             formatted_counts = await format_user_taxon_counts(self, user, taxon)
             if formatted_counts:
-                description += f"\n{TAXON_COUNTS_HEADER}\n{formatted_counts}"
+                counts.users[user.login] = formatted_counts
 
         embed.title = title
-        embed.description = description
+        embed.description = counts.render()
         if taxon.thumbnail:
             embed.set_thumbnail(url=taxon.thumbnail)
 
@@ -396,46 +383,30 @@ class INatEmbeds(MixinMeta):
         """Get user's ranked obs & spp stats for a project."""
         if category == "taxa":
             rank = "unranked"
-            response = await self.api.get_observations(
-                "species_counts",
-                project_id=project_id,
-                user_id=user.user_id,
-                per_page=0,
-            )
+            async with self.api.fan_out():
+                response = await self.api.get_observations(
+                    "species_counts",
+                    project_id=project_id,
+                    user_id=user.user_id,
+                    per_page=0,
+                )
             if response:
                 count = response["total_results"]
             else:
                 count = "unknown"
             return (count, rank)
 
-        kwargs = {}
-        if category == "spp":
-            kwargs["order_by"] = "species_count"
-        # FIXME: cache for a short while so users can compare stats but not
-        # have to worry about stale data.
-        response = await self.api.get_project_observers_stats(
-            project_id=project_id, **kwargs
-        )
-        stats = [ObserverStats.from_dict(observer) for observer in response["results"]]
-        if stats:
-            rank = next(
-                (
-                    index + 1
-                    for (index, d) in enumerate(stats)
-                    if d.user_id == user.user_id
-                ),
-                None,
+        order_by = "species_count" if category == "spp" else None
+        leaderboard = await self.project_table.get_leaderboard(project_id, order_by)
+        rank = leaderboard.get_rank(user.user_id)
+        if rank:
+            ranked = leaderboard.stats[rank - 1]
+            count = (
+                ranked.species_count if category == "spp" else ranked.observation_count
             )
-            if rank:
-                ranked = stats[rank - 1]
-                count = (
-                    ranked.species_count
-                    if category == "spp"
-                    else ranked.observation_count
-                )
-            else:
-                rank = "unranked"
-                count = "unknown"
+        else:
+            rank = "unranked"
+            count = "unknown"
         return (count, rank)
 
     async def get_user_server_projects_stats(self, ctx, user):
@@ -443,21 +414,45 @@ class INatEmbeds(MixinMeta):
         user_projects = await self.config.guild(ctx.guild).user_projects() or {}
         project_ids = list(map(int, user_projects))
         projects = await self.api.get_projects(project_ids, refresh_cache=True)
+        self.project_table.index_user_projects(
+            UserProject.from_dict(projects[project_id]["results"][0])
+            for project_id in project_ids
+            if project_id in projects
+        )
+        user_project_ids = self.project_table.get_user_project_ids(user.user_id)
+        member_project_ids = [
+            project_id for project_id in project_ids if project_id in user_project_ids
+        ]
+
+        # Fetch all stats for all projects at once, requests being sent a few
+        # at a time within the rate limit; a project with any stat that can't
+        # be fetched is left out.
+        categories = ("obs", "spp", "taxa")
+        results = await asyncio.gather(
+            *(
+                self.get_user_project_stats(project_id, user, category=category)
+                for project_id in member_project_ids
+                for category in categories
+            ),
+            return_exceptions=True,
+        )
         stats = []
-        for project_id in project_ids:
-            if project_id not in projects:
+        for (index, project_id) in enumerate(member_project_ids):
+            start = index * len(categories)
+            project_stats = results[start : start + len(categories)]
+            error = next(
+                (
+                    result
+                    for result in project_stats
+                    if isinstance(result, BaseException)
+                ),
+                None,
+            )
+            if error:
+                LOG.error("Stats for project %d not fetched: %r", project_id, error)
                 continue
-            user_project = UserProject.from_dict(projects[project_id]["results"][0])
-            if user.user_id in user_project.observed_by_ids():
-                abbrev = user_projects[str(project_id)]
-                obs_stats = await self.get_user_project_stats(project_id, user)
-                spp_stats = await self.get_user_project_stats(
-                    project_id, user, category="spp"
-                )
-                taxa_stats = await self.get_user_project_stats(
-                    project_id, user, category="taxa"
-                )
-                stats.append((project_id, abbrev, obs_stats, spp_stats, taxa_stats))
+            abbrev = user_projects[str(project_id)]
+            stats.append((project_id, abbrev, *project_stats))
         return stats
 
     async def make_user_embed(self, ctx, member, user):
@@ -526,9 +521,18 @@ class INatEmbeds(MixinMeta):
     async def send_embed_for_taxon_image(self, ctx, taxon):
         """Make embed for taxon image & send."""
         msg = await ctx.send(embed=await self.make_image_embed(taxon))
-        start_adding_reactions(msg, ["#️⃣", "📝", "🏠", "📍"])
+        self.recent_links.add_message(msg)
+        self.add_reaction_controls(msg)
 
     async def send_embed_for_taxon(self, ctx, taxon):
         """Make embed for taxon & send."""
         msg = await ctx.send(embed=await self.make_taxa_embed(taxon))
-        start_adding_reactions(msg, ["#️⃣", "📝", "🏠", "📍"])
+        self.recent_links.add_message(msg)
+        self.add_reaction_controls(msg)
+
+    def add_reaction_controls(self, msg):
+        """Add reactions to add & remove counts to a taxon or counts embed."""
+        counts = CountsEmbed.from_embed(msg.embeds[0])
+        if counts:
+            self.counts_embeds.set(msg.id, counts)
+        start_adding_reactions(msg, REACTION_EMOJIS)
@@ -1,5 +1,6 @@
 """A cog for using the iNaturalist platform."""
 from abc import ABC
+import json
 from math import ceil
 import re
 from typing import Optional, Union
@@ -8,30 +9,44 @@ import asyncio
 import discord
 import inflect
 from redbot.core import checks, commands, Config
-from redbot.core.utils.menus import menu, start_adding_reactions, DEFAULT_CONTROLS
+from redbot.core.data_manager import cog_data_path
 from pyparsing import ParseException
 from .api import INatAPI, WWW_BASE_URL
+from .autocomplete import TaxonNameIndex
+from .bird_codes import INatBirdCodeTable
 from .checks import known_inat_user
-from .common import DEQUOTE, grouper
+from .common import DEQUOTE, LOG
 from .converters import (
     ContextMemberConverter,
     QuotedContextMemberConverter,
     InheritableBoolConverter,
 )
+from .descriptions import RenderedDescriptions
+from .dispatcher import WorkDispatcher
 from .embeds import make_embed, sorry
-from .last import INatLinkMsg
-from .obs import get_obs_fields, maybe_match_obs, PAT_OBS_LINK
+from .last import INatLinkMsg, RecentLinks
+from .locks import KeyedLocks
+from .obs import INatObsQuery, OBS_CACHE_TTL, PAT_OBS_LINK
 from .parsers import RANK_EQUIVALENTS, RANK_KEYWORDS
 from .places import INatPlaceTable, RESERVED_PLACES
-from .projects import INatProjectTable, UserProject
+from .projects import INatProjectTable, LEADERBOARD_TTL, UserProject
+from .reactions import CountsEmbeds, INatCountsEditor, ReactionMessages
+from .registrations import UserRegistrations
 from .listeners import Listeners
-from .search import INatSiteSearch
+from .menus import lazy_menu, LazyPages
+from .metrics import Metrics
+from .search import INatSiteSearch, MAX_SEARCH_RESULTS
+from .settings import SettingsSnapshot
+from .sounds import INatSoundCache
 from .taxa import FilteredTaxon, INatTaxaQuery, get_taxon
 from .users import INatUserTable, PAT_USER_LINK, User
 
 _SCHEMA_VERSION = 2
 _DEVELOPER_BOT_IDS = [614037008217800707, 620938327293558794]
 _INAT_GUILD_ID = 525711945270296587
+RECENT_LINKS_FILE = "recent_links.json"
+# Seconds between saves of recent links (if changed).
+RECENT_LINKS_SAVE_INTERVAL = 300
 SPOILER_PAT = re.compile(r"\|\|")
 DOUBLE_BAR_LIT = "\\|\\|"
 
@@ -50,18 +65,36 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
         super().__init__()
         self.bot = bot
         self.config = Config.get_conf(self, identifier=1607)
+        self.metrics = Metrics()
+        self.dispatcher = WorkDispatcher(self.metrics)
         self.api = INatAPI()
         self.p = inflect.engine()  # pylint: disable=invalid-name
         self.taxa_query = INatTaxaQuery(self)
+        self.obs_query = INatObsQuery(self)
         self.user_table = INatUserTable(self)
         self.place_table = INatPlaceTable(self)
         self.project_table = INatProjectTable(self)
         self.site_search = INatSiteSearch(self)
+        self.sound_cache = INatSoundCache(self)
+        self.bird_code_table = INatBirdCodeTable(self)
+        self.taxon_name_index = TaxonNameIndex()
         self.user_cache_init = {}
-        self.reaction_locks = {}
-        self.predicate_locks = {}
-
-        self.config.register_global(schema_version=1)
+        self.reaction_locks = KeyedLocks(self.metrics, "reaction_locks")
+        self.predicate_locks = KeyedLocks(self.metrics, "predicate_locks")
+        self.recent_links = RecentLinks()
+        self.reaction_messages = ReactionMessages()
+        self.counts_embeds = CountsEmbeds()
+        self.counts_editor = INatCountsEditor(self)
+        self.descriptions = RenderedDescriptions()
+        self.settings = SettingsSnapshot()
+        self.registrations = UserRegistrations()
+
+        self.config.register_global(
+            schema_version=1,
+            bird_codes={},
+            obs_cache_ttl=OBS_CACHE_TTL,
+            leaderboard_ttl=LEADERBOARD_TTL,
+        )
         self.config.register_guild(
             autoobs=False,
             dot_taxon=False,
@@ -78,6 +111,7 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
             home=None, inat_user_id=None, known_in=[], known_all=False
         )
         self._cleaned_up = False
+        self._save_task: asyncio.Task = None
         self._init_task: asyncio.Task = self.bot.loop.create_task(self.initialize())
         self._ready_event: asyncio.Event = asyncio.Event()
 
@@ -88,8 +122,46 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
         """Initialization after bot is ready."""
         await self.bot.wait_until_ready()
         await self._migrate_config(await self.config.schema_version(), _SCHEMA_VERSION)
+        await self.bird_code_table.load()
+        self.obs_query.ttl = await self.config.obs_cache_ttl()
+        self.project_table.leaderboard_ttl = await self.config.leaderboard_ttl()
+        await self.settings.load(self.config)
+        await self.registrations.load(self.config)
+        self.dispatcher.start()
+        self.load_recent_links()
+        self._save_task = self.bot.loop.create_task(self.save_recent_links_task())
         self._ready_event.set()
 
+    def load_recent_links(self):
+        """Load recent links saved before the cog was last unloaded."""
+        path = cog_data_path(self) / RECENT_LINKS_FILE
+        if not path.exists():
+            return
+        try:
+            with open(path, encoding="utf-8") as links_file:
+                self.recent_links.load(json.load(links_file))
+        except (OSError, ValueError, TypeError) as err:
+            LOG.error("Recent links not loaded: %s", err)
+
+    def save_recent_links(self):
+        """Save recent links if changed."""
+        if not self.recent_links.dirty:
+            return
+        path = cog_data_path(self) / RECENT_LINKS_FILE
+        temp_path = path.with_suffix(".tmp")
+        try:
+            with open(temp_path, "w", encoding="utf-8") as links_file:
+                json.dump(self.recent_links.dump(), links_file, separators=(",", ":"))
+            temp_path.replace(path)
+        except OSError as err:
+            LOG.error("Recent links not saved: %s", err)
+
+    async def save_recent_links_task(self):
+        """Periodically save recent links."""
+        while True:
+            await asyncio.sleep(RECENT_LINKS_SAVE_INTERVAL)
+            self.save_recent_links()
+
     async def _migrate_config(self, from_version: int, to_version: int) -> None:
         if from_version == to_version:
             return
@@ -115,6 +187,11 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
             self.api.session.detach()
             if self._init_task:
                 self._init_task.cancel()
+            self.dispatcher.stop()
+            self.counts_editor.cancel()
+            if self._save_task:
+                self._save_task.cancel()
+                self.save_recent_links()
             self._cleaned_up = True
 
     @commands.group()
@@ -123,6 +200,26 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         See `[p]help iNat` for all `inatcog` help topics."""
 
+    @inat.group(name="refresh")
+    @checks.is_owner()
+    async def inat_refresh(self, ctx):
+        """Refresh iNat local data (owner)."""
+
+    @inat_refresh.command(name="bird_codes")
+    @checks.is_owner()
+    async def refresh_bird_codes(self, ctx, refresh_all: bool = False):
+        """Resolve bundled 4-letter bird codes to iNat taxa (owner).
+
+        Only codes not already resolved are looked up, unless *refresh_all*
+        is true. This takes about a second per code.
+        """
+        async with ctx.typing():
+            resolved, unresolved = await self.bird_code_table.refresh(refresh_all)
+        await ctx.send(
+            f"Bird codes resolved: {resolved}; not resolved: {unresolved}; "
+            f"total known: {len(self.bird_code_table.taxon_ids)}."
+        )
+
     @inat.group(name="set")
     @checks.admin_or_permissions(manage_messages=True)
     async def inat_set(self, ctx):
@@ -152,11 +249,53 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         if prefixes:
             await config.bot_prefixes.set(prefixes)
+            self.settings.update_guild(ctx.guild.id, bot_prefixes=prefixes)
         else:
             prefixes = await config.bot_prefixes()
 
         await ctx.send(f"Other bot prefixes are: {repr(list(prefixes))}")
 
+    @inat_set.command(name="obs_cache_ttl")
+    @checks.is_owner()
+    async def set_obs_cache_ttl(self, ctx, seconds: int = None):
+        """Set seconds to cache observations (owner).
+
+        Commands for an observation shown within this many seconds of the
+        last time it was fetched reuse it instead of fetching it again.
+        `[p]obs` and `[p]link` always fetch it fresh.
+
+        If *seconds* is omitted, the current setting is shown.
+        """
+        if seconds is not None:
+            if seconds < 0:
+                await ctx.send_help()
+                return
+            await self.config.obs_cache_ttl.set(seconds)
+            self.obs_query.ttl = seconds
+        await ctx.send(f"Observations are cached for {self.obs_query.ttl} seconds.")
+
+    @inat_set.command(name="leaderboard_ttl")
+    @checks.is_owner()
+    async def set_leaderboard_ttl(self, ctx, seconds: int = None):
+        """Set seconds to cache project leaderboards (owner).
+
+        Project ranks shown by `[p]me`, `[p]my`, `[p]rank` and `[p]user`
+        within this many seconds of the last time a project's leaderboard
+        was fetched reuse it instead of fetching it again.
+
+        If *seconds* is omitted, the current setting is shown.
+        """
+        if seconds is not None:
+            if seconds < 0:
+                await ctx.send_help()
+                return
+            await self.config.leaderboard_ttl.set(seconds)
+            self.project_table.leaderboard_ttl = seconds
+        await ctx.send(
+            "Project leaderboards are cached for "
+            f"{self.project_table.leaderboard_ttl} seconds."
+        )
+
     @inat_set.command(name="inactive_role")
     @checks.admin_or_permissions(manage_roles=True)
     async def set_inactive_role(self, ctx, inactive_role: Optional[discord.Role]):
@@ -223,6 +362,7 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         config = self.config.guild(ctx.guild)
         await config.bot_prefixes.clear()
+        self.settings.update_guild(ctx.guild.id, bot_prefixes=[])
 
         await ctx.send("Server ignored bot prefixes cleared.")
 
@@ -245,6 +385,7 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         config = self.config.channel(ctx.channel)
         await config.autoobs.set(state)
+        self.settings.update_channel(ctx.channel.id, autoobs=state)
 
         if state is None:
             server_state = await self.config.guild(ctx.guild).autoobs()
@@ -269,6 +410,7 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         config = self.config.guild(ctx.guild)
         await config.autoobs.set(state)
+        self.settings.update_guild(ctx.guild.id, autoobs=state)
         await ctx.send(
             f"Server observation auto-preview is {'on' if state else 'off'}."
         )
@@ -318,6 +460,7 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         config = self.config.channel(ctx.channel)
         await config.dot_taxon.set(state)
+        self.settings.update_channel(ctx.channel.id, dot_taxon=state)
 
         if state is None:
             server_state = await self.config.guild(ctx.guild).dot_taxon()
@@ -344,6 +487,7 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         config = self.config.guild(ctx.guild)
         await config.dot_taxon.set(state)
+        self.settings.update_guild(ctx.guild.id, dot_taxon=state)
         await ctx.send(f"Server .taxon. lookup is {'on' if state else 'off'}.")
         return
 
@@ -391,6 +535,13 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
         await ctx.send(f"Channel .taxon. lookup is {value}.")
         return
 
+    @inat_show.command(name="metrics")
+    @checks.is_owner()
+    async def show_metrics(self, ctx):
+        """Show cache hit rates & other internal metrics (owner)."""
+        metrics = self.metrics.format()
+        await ctx.send(f"```\n{metrics}\n```" if metrics else "No metrics yet.")
+
     @inat_show.command(name="bot_prefixes")
     async def show_bot_prefixes(self, ctx):
         """Show server ignored bot prefixes."""
@@ -406,15 +557,23 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
         """Show info for recently mentioned iNat page."""
 
     async def get_last_obs_from_history(self, ctx):
-        """Get last obs from history."""
-        msgs = await ctx.history(limit=1000).flatten()
-        inat_link_msg = INatLinkMsg(self.api)
+        """Get last obs from recent links or else history."""
+        inat_link_msg = INatLinkMsg(self)
+        await self.recent_links.catch_up(ctx.channel, self.metrics)
+        hit = self.recent_links.last_obs(ctx.channel.id)
+        if hit:
+            return await inat_link_msg.get_obs_link_msg(hit)
+        msgs = self.recent_links.scan(ctx.channel, self.metrics)
         return await inat_link_msg.get_last_obs_msg(msgs)
 
     async def get_last_taxon_from_history(self, ctx):
-        """Get last taxon from history."""
-        msgs = await ctx.history(limit=1000).flatten()
-        inat_link_msg = INatLinkMsg(self.api)
+        """Get last taxon from recent links or else history."""
+        inat_link_msg = INatLinkMsg(self)
+        await self.recent_links.catch_up(ctx.channel, self.metrics)
+        hit = self.recent_links.last_taxon(ctx.channel.id)
+        if hit:
+            return await inat_link_msg.get_taxon_link_msg(hit)
+        msgs = self.recent_links.scan(ctx.channel, self.metrics)
         return await inat_link_msg.get_last_taxon_msg(msgs)
 
     @last.group(name="obs", aliases=["observation"], invoke_without_command=True)
@@ -608,10 +767,7 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
             obs_id = int(mat["obs_id"] or mat["cmd_obs_id"])
             url = mat["url"]
 
-            results = (await self.api.get_observations(obs_id, include_new_projects=1))[
-                "results"
-            ]
-            obs = get_obs_fields(results[0]) if results else None
+            obs = await self.obs_query.get_obs(obs_id, refresh_cache=True)
             await ctx.send(embed=await self.make_obs_embed(ctx.guild, obs, url))
             if obs and obs.sound:
                 await self.maybe_send_sound_url(ctx.channel, obs.sound)
@@ -696,33 +852,32 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         config = self.config.guild(ctx.guild)
         places = await config.places()
-        result_pages = []
-        for abbrev in places:
-            # Only lookup cached places. Uncached places will just be shown by number.
-            place_id = int(places[abbrev])
-            if place_id in self.api.places_cache:
-                try:
-                    place = await self.place_table.get_place(ctx.guild, place_id)
-                    place_str = f"{abbrev}: [{place.display_name}]({place.url})"
-                except LookupError:
-                    place_str = f"{abbrev}: {place_id} not found."
-            else:
-                place_str = f"{abbrev}: [{place_id}]({WWW_BASE_URL}/places/{place_id})"
-            result_pages.append(place_str)
-        pages = [
-            "\n".join(filter(None, results)) for results in grouper(result_pages, 10)
-        ]
-        if pages:
-            pages_len = len(pages)  # Causes enumeration (works against lazy load).
-            embeds = [
-                make_embed(
-                    title=f"Place abbreviations (page {index} of {pages_len})",
-                    description=page,
-                )
-                for index, page in enumerate(pages, start=1)
-            ]
-            # menu() does not support lazy load of embeds iterator.
-            await menu(ctx, embeds, DEFAULT_CONTROLS)
+        abbrevs = list(places)
+
+        async def render(index):
+            result_lines = []
+            for abbrev in abbrevs[index * 10 : (index + 1) * 10]:
+                # Only lookup cached places. Uncached places will just be shown by number.
+                place_id = int(places[abbrev])
+                if place_id in self.api.places_cache:
+                    try:
+                        place = await self.place_table.get_place(ctx.guild, place_id)
+                        place_str = f"{abbrev}: [{place.display_name}]({place.url})"
+                    except LookupError:
+                        place_str = f"{abbrev}: {place_id} not found."
+                else:
+                    place_str = (
+                        f"{abbrev}: [{place_id}]({WWW_BASE_URL}/places/{place_id})"
+                    )
+                result_lines.append(place_str)
+            return make_embed(
+                title=f"Place abbreviations (page {index + 1} of {pages_len})",
+                description="\n".join(result_lines),
+            )
+
+        pages_len = ceil(len(abbrevs) / 10)
+        if pages_len:
+            await lazy_menu(ctx, LazyPages(pages_len, render))
         else:
             await ctx.send(embed=sorry(apology="Nothing found"))
 
@@ -794,33 +949,34 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         config = self.config.guild(ctx.guild)
         projects = await config.projects()
-        result_pages = []
-        for abbrev in projects:
-            # Only lookup cached projects. Uncached projects will just be shown by number.
-            proj_id = int(projects[abbrev])
-            if proj_id in self.api.projects_cache:
-                try:
-                    project = await self.project_table.get_project(ctx.guild, proj_id)
-                    proj_str = f"{abbrev}: [{project.title}]({project.url})"
-                except LookupError:
-                    proj_str = f"{abbrev}: {proj_id} not found."
-            else:
-                proj_str = f"{abbrev}: [{proj_id}]({WWW_BASE_URL}/projects/{proj_id})"
-            result_pages.append(proj_str)
-        pages = [
-            "\n".join(filter(None, results)) for results in grouper(result_pages, 10)
-        ]
-        if pages:
-            pages_len = len(pages)  # Causes enumeration (works against lazy load).
-            embeds = [
-                make_embed(
-                    title=f"Project abbreviations (page {index} of {pages_len})",
-                    description=page,
-                )
-                for index, page in enumerate(pages, start=1)
-            ]
-            # menu() does not support lazy load of embeds iterator.
-            await menu(ctx, embeds, DEFAULT_CONTROLS)
+        abbrevs = list(projects)
+
+        async def render(index):
+            result_lines = []
+            for abbrev in abbrevs[index * 10 : (index + 1) * 10]:
+                # Only lookup cached projects. Uncached projects will just be shown by number.
+                proj_id = int(projects[abbrev])
+                if proj_id in self.api.projects_cache:
+                    try:
+                        project = await self.project_table.get_project(
+                            ctx.guild, proj_id
+                        )
+                        proj_str = f"{abbrev}: [{project.title}]({project.url})"
+                    except LookupError:
+                        proj_str = f"{abbrev}: {proj_id} not found."
+                else:
+                    proj_str = (
+                        f"{abbrev}: [{proj_id}]({WWW_BASE_URL}/projects/{proj_id})"
+                    )
+                result_lines.append(proj_str)
+            return make_embed(
+                title=f"Project abbreviations (page {index + 1} of {pages_len})",
+                description="\n".join(result_lines),
+            )
+
+        pages_len = ceil(len(abbrevs) / 10)
+        if pages_len:
+            await lazy_menu(ctx, LazyPages(pages_len, render))
         else:
             await ctx.send(embed=sorry(apology="Nothing found"))
 
@@ -883,6 +1039,8 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
         [p]obs https://inaturalist.org/observations/#
            -> an embed summarizing the observation link (minus the preview,
               which Discord provides itself)
+        [p]obs https://inaturalist.org/observations/# https://...
+           -> an embed for each observation link (up to 10)
         [p]obs insects by kueda
            -> an embed showing counts of insects by user kueda
         [p]obs insects from canada
@@ -890,21 +1048,24 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
         ```
         """
 
-        obs, url = await maybe_match_obs(self.api, query, id_permitted=True)
+        matches = await self.obs_query.maybe_match_obs_list(
+            query, id_permitted=True, refresh_cache=True
+        )
         # Note: if the user specified an invalid or deleted id, a url is still
         # produced (i.e. should 404).
-        if url:
-            await ctx.send(
-                embed=await self.make_obs_embed(ctx.guild, obs, url, preview=False)
-            )
-            if obs and obs.sound:
-                await self.maybe_send_sound_url(ctx.channel, obs.sound)
+        if matches:
+            for obs, url in matches:
+                await ctx.send(
+                    embed=await self.make_obs_embed(ctx.guild, obs, url, preview=False)
+                )
+                if obs and obs.sound:
+                    await self.maybe_send_sound_url(ctx.channel, obs.sound)
             return
 
         try:
             filtered_taxon = await self.taxa_query.query_taxon(ctx, query)
             msg = await ctx.send(embed=await self.make_obs_counts_embed(filtered_taxon))
-            start_adding_reactions(msg, ["#️⃣", "📝", "🏠", "📍"])
+            self.add_reaction_controls(msg)
         except ParseException:
             await ctx.send(embed=sorry())
             return
@@ -1036,29 +1197,34 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
             else:
                 kwargs["sources"] = kw_lowered
                 url += f"&sources={keyword}"
-        (result_pages, total_results, per_page) = await self.site_search.search(
-            query, **kwargs
-        )
-        pages = [
-            "\n".join(filter(None, results)) for results in grouper(result_pages, 10)
-        ]
+        # Each page of search results is only requested when first shown.
+        result_pages = {}
 
-        if pages:
-            pages_len = len(pages)  # Causes enumeration (works against lazy load).
-            if len(result_pages) < total_results:
-                pages_len = (
-                    f"{pages_len}; {ceil((total_results - per_page)/10)} more not shown"
-                )
-            embeds = [
-                make_embed(
-                    title=f"Search: {query} (page {index} of {pages_len})",
-                    url=url,
-                    description=page,
+        def get_results(result_page):
+            if result_page not in result_pages:
+                result_pages[result_page] = asyncio.ensure_future(
+                    self.site_search.search(query, page=result_page, **kwargs)
                 )
-                for index, page in enumerate(pages, start=1)
-            ]
-            # menu() does not support lazy load of embeds iterator.
-            await menu(ctx, embeds, DEFAULT_CONTROLS)
+            return result_pages[result_page]
+
+        (results, total_results, per_page) = await get_results(1)
+
+        async def render(index):
+            # per_page is always a multiple of 10, so a menu page never spans
+            # more than one page of results.
+            start = index * 10
+            result_page = start // per_page + 1
+            (results, _total_results, _per_page) = await get_results(result_page)
+            offset = start - (result_page - 1) * per_page
+            return make_embed(
+                title=f"Search: {query} (page {index + 1} of {pages_len})",
+                url=url,
+                description="\n".join(results[offset : offset + 10]),
+            )
+
+        pages_len = ceil(min(total_results, MAX_SEARCH_RESULTS) / 10) if results else 0
+        if pages_len:
+            await lazy_menu(ctx, LazyPages(pages_len, render))
         else:
             await ctx.send(embed=sorry(apology="Nothing found"))
 
@@ -1254,6 +1420,9 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         known_in.append(ctx.guild.id)
         await config.known_in.set(known_in)
+        self.registrations.update_user(
+            discord_user.id, inat_user_id=user.user_id, known_in=known_in
+        )
 
         await ctx.send(
             f"{discord_user.display_name} is added as {user.display_name()}."
@@ -1275,12 +1444,16 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
             known_in.remove(ctx.guild.id)
             await config.known_in.set(known_in)
             if known_in:
+                self.registrations.update_user(discord_user.id, known_in=known_in)
                 await ctx.send("iNat user removed from this server.")
             else:
                 # Removal from last server removes all traces of the user:
                 await config.inat_user_id.clear()
                 await config.known_all.clear()
                 await config.known_in.clear()
+                self.registrations.update_user(
+                    discord_user.id, inat_user_id=None, known_in=(), known_all=False
+                )
                 await ctx.send("iNat user removed.")
         elif known_in and known_all:
             await ctx.send(
@@ -1288,14 +1461,14 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
             )
 
     async def get_valid_user_config(self, ctx):
-        """Get iNat user config known in this guild."""
-        user_config = self.config.user(ctx.author)
-        inat_user_id = await user_config.inat_user_id()
-        known_in = await user_config.known_in()
-        known_all = await user_config.known_all()
-        if not (inat_user_id and known_all or ctx.guild.id in known_in):
+        """Get iNat user config known in this guild.
+
+        Whether the user is known is looked up in the registrations index,
+        so this doesn't await Config.
+        """
+        if not self.registrations.user(ctx.author.id).is_known_in(ctx.guild.id):
             raise LookupError("Ask a moderator to add your iNat profile link.")
-        return user_config
+        return self.config.user(ctx.author)
 
     async def user_show_settings(self, ctx, config, setting: str = "all"):
         """Show iNat user settings."""
@@ -1386,6 +1559,7 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
 
         if value is not None:
             await config.known_all.set(value)
+            self.registrations.update_user(ctx.author.id, known_all=value)
 
             bot = self.bot.user.name
             if value:
@@ -1407,10 +1581,6 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
         if not ctx.guild:
             return
 
-        # Avoid having to fully enumerate pages of discord/iNat user pairs
-        # which would otherwise do expensive API calls if not in the cache
-        # already just to get # of pages of member users:
-        all_users = await self.config.all_users()
         config = self.config.guild(ctx.guild)
         user_projects = await config.user_projects()
         filter_role = None
@@ -1448,41 +1618,61 @@ class INatCog(Listeners, commands.Cog, name="iNat", metaclass=CompositeMetaClass
             for response in responses
             if response
         ]
+        self.project_table.index_user_projects(projects)
+        # Position of each of this server's projects, to show them in order:
+        project_order = {
+            project.project_id: index for (index, project) in enumerate(projects)
+        }
 
         if not self.user_cache_init.get(ctx.guild.id):
             await self.api.get_observers_from_projects(user_projects.keys())
             self.user_cache_init[ctx.guild.id] = True
 
         def emojis(user_id: int):
+            project_ids = self.project_table.get_user_project_ids(user_id)
             emojis = [
-                user_projects[str(project.project_id)]
-                for project in projects
-                if user_id in project.observed_by_ids()
+                user_projects[str(project_id)]
+                for project_id in sorted(
+                    project_ids.intersection(project_order), key=project_order.get
+                )
             ]
             return " ".join(emojis)
 
-        # TODO: Support lazy loading of pages of users (issues noted in comments below).
-        all_names = [
-            f"{dmember.mention} is {iuser.profile_link()} {emojis(iuser.user_id)}"
-            async for (dmember, iuser) in self.user_table.get_member_pairs(
-                ctx.guild, all_users
-            )
-            if not filter_role or filter_role in dmember.roles
-        ]
-
-        pages = ["\n".join(filter(None, names)) for names in grouper(all_names, 10)]
-
-        if pages:
-            pages_len = len(pages)  # Causes enumeration (works against lazy load).
-            embeds = [
-                make_embed(
-                    title=f"Discord iNat user list (page {index} of {pages_len})",
-                    description=page,
+        # Avoid having to fully enumerate pages of discord/iNat user pairs
+        # which would otherwise do expensive API calls if not in the cache
+        # already just to get # of pages of member users:
+        known_users = {
+            discord_id: inat_user_id
+            for (discord_id, inat_user_id) in self.user_table.get_known_members(
+                ctx.guild
+            ).items()
+            if not filter_role or filter_role in ctx.guild.get_member(discord_id).roles
+        }
+        member_ids = list(known_users)
+
+        async def render(index):
+            page_ids = member_ids[index * 10 : (index + 1) * 10]
+            pairs = {
+                dmember.id: (dmember, iuser)
+                async for (dmember, iuser) in self.user_table.get_member_pairs(
+                    ctx.guild,
+                    {discord_id: known_users[discord_id] for discord_id in page_ids},
+                )
+            }
+            names = [
+                f"{dmember.mention} is {iuser.profile_link()} {emojis(iuser.user_id)}"
+                for (dmember, iuser) in (
+                    pairs[discord_id] for discord_id in page_ids if discord_id in pairs
                 )
-                for index, page in enumerate(pages, start=1)
             ]
-            # menu() does not support lazy load of embeds iterator.
-            await menu(ctx, embeds, DEFAULT_CONTROLS)
+            return make_embed(
+                title=f"Discord iNat user list (page {index + 1} of {pages_len})",
+                description="\n".join(names),
+            )
+
+        pages_len = ceil(len(member_ids) / 10)
+        if pages_len:
+            await lazy_menu(ctx, LazyPages(pages_len, render))
         else:
             await ctx.send(
                 f"No iNat login ids are known. Add them with `{ctx.clean_prefix}user add`."
@@ -6,7 +6,20 @@ from inflect import engine
 from redbot.core import Config
 from redbot.core.bot import Red
 from .api import INatAPI
+from .autocomplete import TaxonNameIndex
+from .bird_codes import INatBirdCodeTable
+from .descriptions import RenderedDescriptions
+from .dispatcher import WorkDispatcher
+from .last import RecentLinks
+from .locks import KeyedLocks
+from .metrics import Metrics
+from .obs import INatObsQuery
 from .places import INatPlaceTable
+from .projects import INatProjectTable
+from .reactions import CountsEmbeds, INatCountsEditor, ReactionMessages
+from .registrations import UserRegistrations
+from .settings import SettingsSnapshot
+from .sounds import INatSoundCache
 from .taxa import INatTaxaQuery
 from .users import INatUserTable
 
@@ -20,12 +33,26 @@ class MixinMeta(ABC):
 
     def __init__(self, *_args):
         self.config: Config
+        self.counts_editor: INatCountsEditor
+        self.counts_embeds: CountsEmbeds
         self.api: INatAPI
+        self.bird_code_table: INatBirdCodeTable
         self.bot: Red
+        self.descriptions: RenderedDescriptions
+        self.dispatcher: WorkDispatcher
+        self.metrics: Metrics
+        self.obs_query: INatObsQuery
         self.p: engine  # pylint: disable=invalid-name
         self.user_table: INatUserTable
-        self.reaction_locks: dict
-        self.predicate_locks: dict
+        self.reaction_locks: KeyedLocks
+        self.reaction_messages: ReactionMessages
+        self.predicate_locks: KeyedLocks
         self.place_table: INatPlaceTable
+        self.project_table: INatProjectTable
+        self.recent_links: RecentLinks
+        self.registrations: UserRegistrations
+        self.settings: SettingsSnapshot
+        self.sound_cache: INatSoundCache
         self.taxa_query: INatTaxaQuery
+        self.taxon_name_index: TaxonNameIndex
         self._ready_event: Event
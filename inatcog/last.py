@@ -1,15 +1,26 @@
 """Module for handling recent history."""
-from typing import NamedTuple
+from calendar import timegm
+from collections import deque
+from typing import List, NamedTuple, Optional
 from datetime import datetime
 import re
-from discord import User
+from discord import Object, User
 
 import timeago
 
 from .api import WWW_BASE_URL
-from .obs import get_obs_fields, PAT_OBS_LINK
+from .scanner import first_match, scan_message, ScanMatch
 from .taxa import get_taxon, PAT_TAXON_LINK
 
+# Links of each kind remembered per channel.
+MAX_RECENT_LINKS = 20
+# Most messages of channel history scanned for links.
+MAX_HISTORY = 1000
+# History pages start small, as the link is usually in the latest messages,
+# and double in size up to Discord's maximum.
+FIRST_HISTORY_PAGE = 10
+MAX_HISTORY_PAGE = 100
+
 
 class ObsLinkMsg(NamedTuple):
     """Discord & iNat fields from a recent observation link."""
@@ -27,63 +38,324 @@ class TaxonLinkMsg(NamedTuple):
     taxon: dict
 
 
+class LinkHit(NamedTuple):
+    """A link to an iNat observation or taxon in a Discord message."""
+
+    message_id: int
+    name: str
+    link_id: int
+    url: str
+    created_at: datetime
+
+
+def match_obs_link(message, matches: Optional[List[ScanMatch]] = None):
+    """Match observation link in message.
+
+    The message content is scanned unless already scanned *matches* are
+    given.
+    """
+    # Skip bot messages so we can extract the user info for the user who shared it
+    if message.author.bot:
+        return None
+    if matches is None:
+        matches = scan_message(message.content)
+    return first_match(matches, "obs")
+
+
+def match_taxon_link(message, matches: Optional[List[ScanMatch]] = None):
+    """Match taxon link in message or its embed.
+
+    The message content is scanned unless already scanned *matches* are
+    given.
+    """
+    # - Include bot msgs because that's mostly how users share these links,
+    #   and we're not interested in who shared the link in this case.
+    # - If the message is from a bot, it's likely an embed, so search the
+    #   url (only 1st embed for the message is checked).
+    if matches is None:
+        matches = scan_message(message.content)
+    return first_match(matches, "taxon") or (
+        message.embeds
+        and message.embeds[0].url
+        and re.search(PAT_TAXON_LINK, message.embeds[0].url)
+    )
+
+
+def get_obs_link_hit(message, matches=None) -> Optional[LinkHit]:
+    """Get observation link hit from message, if any."""
+    mat = match_obs_link(message, matches)
+    if not mat:
+        return None
+    obs_id = int(mat["obs_id"] or mat["cmd_obs_id"])
+    url = mat["url"] or WWW_BASE_URL + "/observations/" + str(obs_id)
+    if isinstance(message.author, User):
+        name = message.author.name
+    else:
+        name = message.author.nick or message.author.name
+    return LinkHit(message.id, name, obs_id, url, message.created_at)
+
+
+def get_taxon_link_hit(message, matches=None) -> Optional[LinkHit]:
+    """Get taxon link hit from message, if any."""
+    mat = match_taxon_link(message, matches)
+    if not mat:
+        return None
+    taxon_id = int(mat["taxon_id"])
+    url = mat["url"] or WWW_BASE_URL + "/taxa/" + str(taxon_id)
+    return LinkHit(message.id, message.author.name, taxon_id, url, message.created_at)
+
+
+async def get_history(channel, before=None, limit=MAX_HISTORY, metrics=None):
+    """Yield messages from channel history newest first, one page at a time.
+
+    Parameters
+    ----------
+    channel: discord.abc.Messageable
+        The channel to fetch history from.
+    before: discord.abc.Snowflake, optional
+        Only fetch messages before this one.
+    limit: int, optional
+        Most messages to fetch.
+    metrics: Metrics, optional
+        Where to count pages & messages fetched.
+    """
+    page_size = FIRST_HISTORY_PAGE
+    while limit > 0:
+        size = min(page_size, limit)
+        page = await channel.history(limit=size, before=before).flatten()
+        if metrics:
+            metrics.incr("history.pages")
+            metrics.incr("history.messages", len(page))
+        for message in page:
+            yield message
+        if len(page) < size:
+            return
+        limit -= size
+        before = page[-1]
+        page_size = min(page_size * 2, MAX_HISTORY_PAGE)
+
+
+class RecentLinks:
+    """Ring buffers of recent observation & taxon links for each channel.
+
+    Filled from messages as they are seen so the latest link can be looked
+    up without scanning channel history. History is scanned only when no
+    link of the kind is known, resuming from the oldest message scanned so
+    far, and no message is scanned twice. A channel is primed once its
+    history has been fully scanned; from then on, the buffers for the
+    channel are complete and history needn't be scanned again.
+
+    The buffers can be saved & loaded (see `dump` & `load`) so they survive
+    a restart. Loaded channels are stale until the messages sent while the
+    bot was away are scanned (see `catch_up`).
+    """
+
+    def __init__(self, maxlen=MAX_RECENT_LINKS):
+        self.maxlen = maxlen
+        self.obs = {}
+        self.taxa = {}
+        self.primed = set()
+        self.scanned = {}
+        self.latest = {}
+        self.stale = {}
+        self.dirty = False
+
+    def _add(self, links: dict, channel_id: int, hit: LinkHit):
+        hits = links.get(channel_id)
+        if hits is None:
+            hits = links[channel_id] = deque(maxlen=self.maxlen)
+        if not hits or hit.message_id > hits[-1].message_id:
+            hits.append(hit)
+        elif all(old.message_id != hit.message_id for old in hits):
+            # Older than the newest hit (e.g. from history): keep in id order.
+            ordered = sorted([*hits, hit], key=lambda hit: hit.message_id)
+            hits.clear()
+            hits.extend(ordered[-self.maxlen :])
+        self.dirty = True
+
+    def add_message(self, message, matches: Optional[List[ScanMatch]] = None):
+        """Add links from a message.
+
+        The message content is scanned unless already scanned *matches* are
+        given.
+        """
+        channel_id = message.channel.id
+        if message.id > self.latest.get(channel_id, 0):
+            self.latest[channel_id] = message.id
+        if matches is None:
+            matches = scan_message(message.content)
+        obs_hit = get_obs_link_hit(message, matches)
+        if obs_hit:
+            self._add(self.obs, channel_id, obs_hit)
+        taxon_hit = get_taxon_link_hit(message, matches)
+        if taxon_hit:
+            self._add(self.taxa, channel_id, taxon_hit)
+
+    def remove_message(self, channel_id: int, message_id: int):
+        """Remove links from a deleted message."""
+        for links in (self.obs, self.taxa):
+            hits = links.get(channel_id)
+            if hits:
+                for hit in [hit for hit in hits if hit.message_id == message_id]:
+                    hits.remove(hit)
+                    self.dirty = True
+
+    async def scan(self, channel, metrics=None):
+        """Yield messages from channel history not scanned yet, adding links.
+
+        The caller may stop iterating as soon as it finds what it needs.
+        """
+        channel_id = channel.id
+        if channel_id in self.primed:
+            return
+        (oldest_id, count) = self.scanned.get(channel_id, (None, 0))
+        before = Object(id=oldest_id) if oldest_id else None
+        async for message in get_history(
+            channel, before=before, limit=MAX_HISTORY - count, metrics=metrics
+        ):
+            self.add_message(message)
+            count += 1
+            self.scanned[channel_id] = (message.id, count)
+            self.dirty = True
+            yield message
+        self.primed.add(channel_id)
+        self.scanned.pop(channel_id, None)
+
+    async def catch_up(self, channel, metrics=None):
+        """Add links from messages missed since the channel was loaded."""
+        stale_id = self.stale.pop(channel.id, None)
+        if not stale_id:
+            return
+        async for message in get_history(channel, metrics=metrics):
+            if message.id <= stale_id:
+                break
+            self.add_message(message)
+
+    def dump(self):
+        """Dump the links as compact JSON-serializable data.
+
+        Each link is a list of message id, author name, obs or taxon id,
+        timestamp (UTC seconds) and url (only if not the default url).
+        """
+
+        def dump_hits(links: dict, default_url: str):
+            return {
+                channel_id: [
+                    [
+                        hit.message_id,
+                        hit.name,
+                        hit.link_id,
+                        timegm(hit.created_at.utctimetuple()),
+                    ]
+                    + ([] if hit.url == default_url % hit.link_id else [hit.url])
+                    for hit in hits
+                ]
+                for (channel_id, hits) in links.items()
+                if hits
+            }
+
+        self.dirty = False
+        return {
+            "obs": dump_hits(self.obs, WWW_BASE_URL + "/observations/%d"),
+            "taxa": dump_hits(self.taxa, WWW_BASE_URL + "/taxa/%d"),
+            "latest": self.latest,
+            "primed": list(self.primed),
+            "scanned": self.scanned,
+        }
+
+    def load(self, data: dict):
+        """Load links dumped before a restart."""
+
+        def load_hits(dumped: dict, default_url: str):
+            return {
+                int(channel_id): deque(
+                    [
+                        LinkHit(
+                            message_id,
+                            name,
+                            link_id,
+                            default_url % link_id if not url else url[0],
+                            datetime.utcfromtimestamp(timestamp),
+                        )
+                        for (message_id, name, link_id, timestamp, *url) in hits
+                    ],
+                    maxlen=self.maxlen,
+                )
+                for (channel_id, hits) in dumped.items()
+            }
+
+        self.obs = load_hits(data.get("obs", {}), WWW_BASE_URL + "/observations/%d")
+        self.taxa = load_hits(data.get("taxa", {}), WWW_BASE_URL + "/taxa/%d")
+        self.latest = {
+            int(channel_id): message_id
+            for (channel_id, message_id) in data.get("latest", {}).items()
+        }
+        self.primed = set(data.get("primed", []))
+        self.scanned = {
+            int(channel_id): tuple(scanned)
+            for (channel_id, scanned) in data.get("scanned", {}).items()
+        }
+        self.stale = dict(self.latest)
+        self.dirty = False
+
+    def is_primed(self, channel_id: int):
+        """Return True if history for the channel has been scanned."""
+        return channel_id in self.primed
+
+    def last_obs(self, channel_id: int) -> Optional[LinkHit]:
+        """Get most recent observation link in channel."""
+        hits = self.obs.get(channel_id)
+        return hits[-1] if hits else None
+
+    def last_taxon(self, channel_id: int) -> Optional[LinkHit]:
+        """Get most recent taxon link in channel."""
+        hits = self.taxa.get(channel_id)
+        return hits[-1] if hits else None
+
+
 class INatLinkMsg:
     """Get INat link message from channel history supplemented with info from iNat."""
 
-    def __init__(self, api):
-        self.api = api
+    def __init__(self, cog):
+        self.cog = cog
+
+    async def get_obs_link_msg(self, hit: LinkHit):
+        """Get observation link message for a link hit."""
+        ago = timeago.format(hit.created_at, datetime.utcnow())
+        obs = await self.cog.obs_query.get_obs(hit.link_id)
+
+        return ObsLinkMsg(hit.url, obs, ago, hit.name)
+
+    async def get_taxon_link_msg(self, hit: LinkHit):
+        """Get taxon link message for a link hit."""
+        taxon = await get_taxon(self.cog, hit.link_id)
+
+        return TaxonLinkMsg(hit.url, taxon)
 
     async def get_last_obs_msg(self, msgs):
-        """Find recent observation link."""
-        # Skip bot messages so we can extract the user info for the user who shared it
-        try:
-            found = next(
-                m
-                for m in msgs
-                if not m.author.bot and re.search(PAT_OBS_LINK, m.content)
-            )
-        except StopIteration:
-            return None
-
-        mat = re.search(PAT_OBS_LINK, found.content)
-        obs_id = int(mat["obs_id"] or mat["cmd_obs_id"])
-        url = mat["url"] or WWW_BASE_URL + "/observations/" + str(obs_id)
-        ago = timeago.format(found.created_at, datetime.utcnow())
-        if isinstance(found.author, User):
-            name = found.author.name
-        else:
-            name = found.author.nick or found.author.name
-
-        results = (await self.api.get_observations(obs_id, include_new_projects=1))[
-            "results"
-        ]
-        obs = get_obs_fields(results[0]) if results else None
-
-        return ObsLinkMsg(url, obs, ago, name)
+        """Find recent observation link.
+
+        Parameters
+        ----------
+        msgs: AsyncIterator[discord.Message]
+            Messages newest first; iteration stops at the first link found.
+        """
+        async for message in msgs:
+            hit = get_obs_link_hit(message)
+            if hit:
+                return await self.get_obs_link_msg(hit)
+        return None
 
     async def get_last_taxon_msg(self, msgs):
-        """Find recent taxon link."""
-
-        def match_taxon_link(message):
-            return re.search(PAT_TAXON_LINK, message.content) or (
-                message.embeds
-                and message.embeds[0].url
-                and re.search(PAT_TAXON_LINK, message.embeds[0].url)
-            )
-
-        # - Include bot msgs because that's mostly how users share these links,
-        #   and we're not interested in who shared the link in this case.
-        # - If the message is from a bot, it's likely an embed, so search the
-        #   url (only 1st embed for the message is checked).
-        try:
-            found = next(m for m in msgs if match_taxon_link(m))
-        except StopIteration:
-            return None
-
-        mat = match_taxon_link(found)
-        taxon_id = int(mat["taxon_id"])
-        url = mat["url"] or WWW_BASE_URL + "/taxa/" + str(taxon_id)
-
-        taxon = await get_taxon(self, taxon_id)
-
-        return TaxonLinkMsg(url, taxon)
+        """Find recent taxon link.
+
+        Parameters
+        ----------
+        msgs: AsyncIterator[discord.Message]
+            Messages newest first; iteration stops at the first link found.
+        """
+        async for message in msgs:
+            hit = get_taxon_link_hit(message)
+            if hit:
+                return await self.get_taxon_link_msg(hit)
+        return None
@@ -2,33 +2,21 @@
 from typing import NamedTuple, Union
 import asyncio
 import contextlib
+from functools import partial
 import re
 import discord
 from pyparsing import ParseException
 from redbot.core import commands
 from redbot.core.bot import Red
-from redbot.core.utils.menus import start_adding_reactions
 from redbot.core.utils.predicates import MessagePredicate
 from .common import LOG
 from .converters import ContextMemberConverter
 from .inat_embeds import INatEmbeds
 from .interfaces import MixinMeta
-from .obs import maybe_match_obs, PAT_OBS_TAXON_LINK
+from .obs import get_obs_link_urls
 from .places import Place
-from .taxa import (
-    get_taxon,
-    format_place_taxon_counts,
-    format_user_taxon_counts,
-    PAT_TAXON_LINK,
-    TAXON_COUNTS_HEADER,
-    TAXON_COUNTS_HEADER_PAT,
-    TAXON_PLACES_HEADER,
-    TAXON_PLACES_HEADER_PAT,
-)
-
-# Minimum 4 characters, first dot must not be followed by a space. Last dot
-# must not be preceded by a space.
-DOT_TAXON_PAT = re.compile(r"(^|\s)\.(?P<query>[^\s\.].{2,}?[^\s\.])\.(\s|$)")
+from .reactions import CountsEmbed, REACTION_EMOJIS
+from .scanner import first_match, scan_message
 
 
 class PartialAuthor(NamedTuple):
@@ -62,73 +50,110 @@ class Listeners(INatEmbeds, MixinMeta):
     async def on_message_without_command(self, message: discord.Message) -> None:
         """Handle links to iNat."""
         await self._ready_event.wait()
-        if message.author.bot or message.guild is None:
+        if message.guild is None:
             return
-
         guild = message.guild
         channel = message.channel
-        guild_config = self.config.guild(guild)
+        dot_taxon = not message.author.bot and self.settings.dot_taxon(channel)
+        matches = scan_message(message.content, dot_taxon)
+        # Remember links from all messages, including our own embeds, for `last`:
+        self.recent_links.add_message(message, matches)
+        if message.author.bot:
+            if message.author == self.bot.user and message.embeds:
+                self.reaction_messages.add(message)
+            return
 
         # - on_message_without_command only ignores bot prefixes for this instance
         # - implementation as suggested by Trusty:
         #   - https://cogboard.red/t/approved-dronefly/541/5?u=syntheticbee
-        bot_prefixes = await guild_config.bot_prefixes()
+        if self.settings.is_bot_command(message):
+            return
 
-        if bot_prefixes:
-            prefixes = r"|".join(re.escape(bot_prefix) for bot_prefix in bot_prefixes)
-            prefix_pattern = re.compile(r"^({prefixes})".format(prefixes=prefixes))
-            if re.match(prefix_pattern, message.content):
-                return
+        obs_urls = get_obs_link_urls(matches) if self.settings.autoobs(channel) else {}
+        dot_taxon_mat = first_match(matches, "dot_taxon") if dot_taxon else None
+        if obs_urls or dot_taxon_mat:
+            self.dispatcher.submit(
+                guild.id,
+                partial(self.handle_message_links, message, obs_urls, dot_taxon_mat),
+            )
 
-        channel_autoobs = await self.config.channel(channel).autoobs()
-        if channel_autoobs is None:
-            autoobs = await guild_config.autoobs()
-        else:
-            autoobs = channel_autoobs
+    @commands.Cog.listener()
+    async def on_command(self, ctx: commands.Context) -> None:
+        """Remember links in messages invoking commands, e.g. `[p]obs 123`."""
+        await self._ready_event.wait()
+        if ctx.guild is None:
+            return
+        self.recent_links.add_message(ctx.message)
 
-        if autoobs:
-            obs, url = await maybe_match_obs(self.api, message.content)
-            # Only output if an observation is found
-            if obs:
+    async def handle_message_links(self, message, obs_urls, dot_taxon_mat):
+        """Preview observations linked and look up `.taxon.` in a message."""
+        guild = message.guild
+        channel = message.channel
+        if obs_urls:
+            obs_list = await self.obs_query.get_obs_list(obs_urls)
+            # Only output observations that are found
+            found = [(obs, url) for (obs, url) in obs_list if obs]
+            for obs, url in found:
                 await message.channel.send(
                     embed=await self.make_obs_embed(guild, obs, url, preview=False)
                 )
-                if obs and obs.sound:
+                if obs.sound:
                     await self.maybe_send_sound_url(channel, obs.sound)
+            if found:
                 ctx = PartialContext(
                     self.bot, guild, channel, message.author, message, "msg autoobs"
                 )
                 self.bot.dispatch("commandstats_action", ctx)
 
-        channel_dot_taxon = await self.config.channel(channel).dot_taxon()
-        if channel_dot_taxon is None:
-            dot_taxon = await guild_config.dot_taxon()
-        else:
-            dot_taxon = channel_dot_taxon
-
-        if dot_taxon:
-            mat = re.search(DOT_TAXON_PAT, message.content)
-            if mat:
-                ctx = PartialContext(
-                    self.bot, guild, channel, message.author, message, "msg dot_taxon"
+        if dot_taxon_mat:
+            ctx = PartialContext(
+                self.bot, guild, channel, message.author, message, "msg dot_taxon"
+            )
+            try:
+                filtered_taxon = await self.taxa_query.query_taxon(
+                    ctx, dot_taxon_mat["query"]
+                )
+            except (LookupError, ParseException):
+                return
+            if filtered_taxon.user or filtered_taxon.place:
+                msg = await channel.send(
+                    embed=await self.make_obs_counts_embed(filtered_taxon)
+                )
+            else:
+                msg = await channel.send(
+                    embed=await self.make_taxa_embed(filtered_taxon)
                 )
-                try:
-                    filtered_taxon = await self.taxa_query.query_taxon(
-                        ctx, mat["query"]
-                    )
-                except (LookupError, ParseException):
-                    return
-                if filtered_taxon.user or filtered_taxon.place:
-                    msg = await channel.send(
-                        embed=await self.make_obs_counts_embed(filtered_taxon)
-                    )
-                else:
-                    msg = await channel.send(
-                        embed=await self.make_taxa_embed(filtered_taxon)
-                    )
 
-                start_adding_reactions(msg, ["#️⃣", "📝", "🏠", "📍"])
-                self.bot.dispatch("commandstats_action", ctx)
+            self.recent_links.add_message(msg)
+            self.add_reaction_controls(msg)
+            self.bot.dispatch("commandstats_action", ctx)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(
+        self, payload: discord.raw_models.RawMessageDeleteEvent
+    ) -> None:
+        """Forget links from deleted messages."""
+        self.recent_links.remove_message(payload.channel_id, payload.message_id)
+        self.reaction_messages.remove(payload.message_id)
+        self.counts_embeds.remove(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(
+        self, payload: discord.raw_models.RawBulkMessageDeleteEvent
+    ) -> None:
+        """Forget links from messages deleted at once, e.g. by a purge."""
+        for message_id in payload.message_ids:
+            self.recent_links.remove_message(payload.channel_id, message_id)
+            self.reaction_messages.remove(message_id)
+            self.counts_embeds.remove(message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(
+        self, payload: discord.raw_models.RawMessageUpdateEvent
+    ) -> None:
+        """Forget edited messages no longer kept up to date by discord.py."""
+        if payload.cached_message is None:
+            self.reaction_messages.remove(payload.message_id)
 
     async def handle_member_reaction(
         self,
@@ -139,35 +164,16 @@ class Listeners(INatEmbeds, MixinMeta):
     ):
         """Central handler for member reactions."""
 
-        def get_ids(embed):
-            """Match taxon_id & optional place_id/user_id."""
-            taxon_id = None
-            place_id = None
-            user_id = None
-            url = embed.url
-            if url:
-                mat = re.match(PAT_TAXON_LINK, url)
-                if not mat:
-                    mat = re.match(PAT_OBS_TAXON_LINK, url)
-                    if mat:
-                        place_id = mat["place_id"]
-                        user_id = mat["user_id"]
-                if mat:
-                    taxon_id = mat["taxon_id"]
-            return (taxon_id, place_id, user_id)
-
         async def maybe_update_member(
             msg: discord.Message, member: discord.Member, action: str
         ):
             try:
                 inat_user = await self.user_table.get_user(member)
-                counts_pat = r"(\n|^)\[[0-9 \(\)]+\]\(.*?\) " + inat_user.login
             except LookupError:
                 return
 
-            taxon = await get_taxon(self, taxon_id)
             # Observed by count add/remove for taxon:
-            await edit_totals_locked(msg, taxon, inat_user, action, counts_pat)
+            self.counts_editor.change(msg, counts, "users", inat_user, action)
 
         async def maybe_update_place(
             msg: discord.Message,
@@ -192,11 +198,7 @@ class Listeners(INatEmbeds, MixinMeta):
             else:
                 place = place_or_member
 
-            place_counts_pat = r"(\n|^)\[[0-9 \(\)]+\]\(.*?\) " + re.escape(
-                place.display_name
-            )
-            taxon = await get_taxon(self, taxon_id)
-            await edit_place_totals_locked(msg, taxon, place, action, place_counts_pat)
+            self.counts_editor.change(msg, counts, "places", place, action)
 
         async def query_locked(msg, user, prompt, timeout):
             """Query member with user lock."""
@@ -207,9 +209,8 @@ class Listeners(INatEmbeds, MixinMeta):
                 #   contain the cancel command? then we could remove this
                 #   foolishness.
                 prefixes = await self.bot.get_valid_prefixes(msg.guild)
-                config = self.config.guild(msg.guild)
-                other_bot_prefixes = await config.bot_prefixes()
-                all_prefixes = prefixes + other_bot_prefixes
+                other_bot_prefixes = self.settings.guild(msg.guild.id).bot_prefixes
+                all_prefixes = prefixes + list(other_bot_prefixes)
                 ignore_prefixes = r"|".join(
                     re.escape(prefix) for prefix in all_prefixes
                 )
@@ -219,16 +220,13 @@ class Listeners(INatEmbeds, MixinMeta):
                 return not re.match(prefix_pat, response.content)
 
             response = None
-            if member.id not in self.predicate_locks:
-                self.predicate_locks[user.id] = asyncio.Lock()
-            lock = self.predicate_locks[user.id]
-            if lock.locked():
+            if self.predicate_locks.locked(user.id):
                 # An outstanding query for this user hasn't been answered.
                 # They must answer it or the timeout must expire before they
                 # can start another interaction.
                 return
 
-            async with self.predicate_locks[user.id]:
+            async with self.predicate_locks.lock(user.id):
                 query = await msg.channel.send(prompt)
                 try:
                     response = await self.bot.wait_for(
@@ -312,113 +310,6 @@ class Listeners(INatEmbeds, MixinMeta):
 
                 await maybe_update_place(msg, place, "toggle")
 
-        async def update_totals(description, taxon, inat_user, action, counts_pat):
-            """Update the totals for the embed."""
-            # Add/remove always results in a change to totals, so remove:
-            description = re.sub(
-                r"\n\[[0-9 \(\)]+?\]\(.*?\) \*total\*", "", description
-            )
-
-            matches = re.findall(
-                r"\n\[[0-9 \(\)]+\]\(.*?\) (?P<user_id>[-_a-z0-9]+)", description
-            )
-            if action == "remove":
-                # Remove the header if last one and the user's count:
-                if len(matches) == 1:
-                    description = re.sub(TAXON_COUNTS_HEADER_PAT, "", description)
-                description = re.sub(counts_pat + r".*?((?=\n)|$)", "", description)
-            else:
-                # Add the header if first one and the user's count:
-                if not matches:
-                    description += "\n" + TAXON_COUNTS_HEADER
-                formatted_counts = await format_user_taxon_counts(
-                    self, inat_user, taxon, place_id
-                )
-                description += "\n" + formatted_counts
-
-            matches = re.findall(
-                r"\n\[[0-9 \(\)]+\]\(.*?\) (?P<user_id>[-_a-z0-9]+)", description
-            )
-            # Total added only if more than one user:
-            if len(matches) > 1:
-                formatted_counts = await format_user_taxon_counts(
-                    self, ",".join(matches), taxon, place_id
-                )
-                description += f"\n{formatted_counts}"
-                return description
-            return description
-
-        async def edit_totals_locked(msg, taxon, inat_user, action, counts_pat):
-            """Update totals for message locked."""
-            if msg.id not in self.reaction_locks:
-                self.reaction_locks[msg.id] = asyncio.Lock()
-            async with self.reaction_locks[msg.id]:
-                # Refetch the message because it may have changed prior to
-                # acquiring lock
-                try:
-                    msg = await msg.channel.fetch_message(msg.id)
-                except discord.errors.NotFound:
-                    return  # message has been deleted, nothing left to do
-                embeds = msg.embeds
-                embed = embeds[0]
-                description = embed.description or ""
-                mat = re.search(counts_pat, description)
-                if action == "toggle":
-                    action = "remove" if mat else "add"
-
-                if (mat and (action == "remove")) or (not mat and (action == "add")):
-                    embed.description = await update_totals(
-                        description, taxon, inat_user, action, counts_pat
-                    )
-                    if re.search(r"\*total\*", embed.description):
-                        embed.set_footer(
-                            text="User counts may not add up to "
-                            "the total if they changed since they were added. "
-                            "Remove, then add them again to update their counts."
-                        )
-                    else:
-                        embed.set_footer(text="")
-                    await msg.edit(embed=embed)
-
-        async def update_place_totals(
-            description, taxon, place, action, place_counts_pat
-        ):
-            """Update the place totals for the embed."""
-            # Add/remove always results in a change to totals, so remove:
-            description = re.sub(
-                r"\n\[[0-9 \(\)]+?\]\(.*?\) \*total\*", "", description
-            )
-
-            matches = re.findall(r"\n\[[0-9 \(\)]+\]\(.*?\) (.*?)(\n|$)", description)
-            if action == "remove":
-                # Remove the header if last one and the place's count:
-                if len(matches) == 1:
-                    description = re.sub(TAXON_PLACES_HEADER_PAT, "", description)
-                description = re.sub(
-                    place_counts_pat + r".*?((?=\n)|$)", "", description
-                )
-            else:
-                # Add the header if first one and the place's count:
-                if not matches:
-                    description += "\n" + TAXON_PLACES_HEADER
-                formatted_counts = await format_place_taxon_counts(
-                    self, place, taxon, user_id
-                )
-                description += "\n" + formatted_counts
-
-            matches = re.findall(
-                r"\n\[[0-9 \(\)]+\]\(.*?&place_id=(?P<place_id>\d+?)&.*?\) .*?(?:(?=\n|$))",
-                description,
-            )
-            # Total added only if more than one place:
-            if len(matches) > 1:
-                formatted_counts = await format_place_taxon_counts(
-                    self, ",".join(matches), taxon, user_id
-                )
-                description += f"\n{formatted_counts}"
-                return description
-            return description
-
         def dispatch_commandstats(message, command):
             partial_author = PartialAuthor(bot=False)
             fake_command_message = PartialMessage(partial_author, message.guild)
@@ -432,64 +323,36 @@ class Listeners(INatEmbeds, MixinMeta):
             )
             self.bot.dispatch("commandstats_action", ctx)
 
-        async def edit_place_totals_locked(msg, taxon, place, action, place_counts_pat):
-            """Update place totals for message locked."""
-            if msg.id not in self.reaction_locks:
-                self.reaction_locks[msg.id] = asyncio.Lock()
-            async with self.reaction_locks[msg.id]:
-                # Refetch the message because it may have changed prior to
-                # acquiring lock
-                try:
-                    msg = await msg.channel.fetch_message(msg.id)
-                except discord.errors.NotFound:
-                    return  # message has been deleted, nothing left to do
-                embeds = msg.embeds
-                embed = embeds[0]
-                description = embed.description or ""
-                mat = re.search(place_counts_pat, description)
-                if action == "toggle":
-                    action = "remove" if mat else "add"
-
-                if (mat and (action == "remove")) or (not mat and (action == "add")):
-                    embed.description = await update_place_totals(
-                        description, taxon, place, action, place_counts_pat
-                    )
-                    if re.search(r"\*total\*", embed.description):
-                        embed.set_footer(
-                            text="Non-overlapping place counts may not add up to "
-                            "the total if they changed since they were added. "
-                            "Remove, then add them again to update their counts."
-                        )
-                    else:
-                        embed.set_footer(text="")
-                    await msg.edit(embed=embed)
-
-        embeds = message.embeds
-        if not embeds:
-            return
-        embed = embeds[0]
-        taxon_id, place_id, user_id = get_ids(embed)
-        if not taxon_id:
-            return
-
-        description = embed.description or ""
-        has_users = re.search(TAXON_COUNTS_HEADER_PAT, description)
-        has_places = re.search(TAXON_PLACES_HEADER_PAT, description)
+        counts = self.counts_embeds.get(message.id)
+        if counts is None:
+            if not message.embeds:
+                return
+            counts = CountsEmbed.from_embed(message.embeds[0])
+            if not counts:
+                return
+            self.counts_embeds.set(message.id, counts)
 
+        has_places = self.counts_editor.has_entries(message.id, counts, "places")
+        has_users = self.counts_editor.has_entries(message.id, counts, "users")
         try:
-            if has_places is None:
+            if not has_places:
                 if str(emoji) == "#️⃣":  # Add/remove counts for self
                     await maybe_update_member(message, member, action)
                     dispatch_commandstats(message, "react self")
                 elif str(emoji) == "📝":  # Toggle counts by name
-                    await maybe_update_member_by_name(message, member)
+                    # Prompts wait for an answer, so don't hold a worker:
+                    self.dispatcher.detach(
+                        partial(maybe_update_member_by_name, message, member)
+                    )
                     dispatch_commandstats(message, "react user")
-            if has_users is None:
+            if not has_users:
                 if str(emoji) == "🏠":
                     await maybe_update_place(message, member, action)
                     dispatch_commandstats(message, "react home")
                 elif str(emoji) == "📍":
-                    await maybe_update_place_by_name(message, member)
+                    self.dispatcher.detach(
+                        partial(maybe_update_place_by_name, message, member)
+                    )
                     dispatch_commandstats(message, "react place")
         except Exception:
             LOG.error(
@@ -513,37 +376,61 @@ class Listeners(INatEmbeds, MixinMeta):
         if member is None or member.bot:
             raise ValueError("User is not a guild member.")
         channel = self.bot.get_channel(payload.channel_id)
-        try:
-            message = next(
-                msg for msg in self.bot.cached_messages if msg.id == payload.message_id
-            )
-        except StopIteration:  # too old; have to fetch it
+        message = self.reaction_messages.get(payload.message_id)
+        if message:
+            self.metrics.incr("reaction_messages.hit")
+        else:  # too old; have to fetch it
+            self.metrics.incr("reaction_messages.miss")
             try:
                 message = await channel.fetch_message(payload.message_id)
             except discord.errors.NotFound:
                 raise ValueError("Message was deleted before reaction handled.")
+            if message.author == self.bot.user:
+                self.reaction_messages.add(message)
         if message.author != self.bot.user:
             raise ValueError("Reaction is not to our own message.")
         return (member, message)
 
+    def dispatch_reaction(
+        self, payload: discord.raw_models.RawReactionActionEvent, action: str
+    ):
+        """Queue handling of a reaction.
+
+        A reaction by the same member with the same emoji on the same message
+        that is still queued is superseded by this one.
+        """
+        if (
+            not payload.guild_id
+            or str(payload.emoji) not in REACTION_EMOJIS
+            or payload.user_id == self.bot.user.id
+        ):
+            return
+        self.dispatcher.submit(
+            payload.guild_id,
+            partial(self.handle_reaction, payload, action),
+            key=(payload.message_id, payload.user_id, str(payload.emoji)),
+        )
+
+    async def handle_reaction(
+        self, payload: discord.raw_models.RawReactionActionEvent, action: str
+    ):
+        """Handle a reaction added to or removed from a bot message."""
+        try:
+            (member, message) = await self.maybe_get_reaction(payload)
+        except ValueError:
+            return
+        await self.handle_member_reaction(payload.emoji, member, message, action)
+
     @commands.Cog.listener()
     async def on_raw_reaction_add(
         self, payload: discord.raw_models.RawReactionActionEvent
     ) -> None:
         """Central handler for reactions added to bot messages."""
-        try:
-            (member, message) = await self.maybe_get_reaction(payload)
-        except ValueError:
-            return
-        await self.handle_member_reaction(payload.emoji, member, message, "add")
+        self.dispatch_reaction(payload, "add")
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(
         self, payload: discord.raw_models.RawReactionActionEvent
     ) -> None:
         """Central handler for reactions removed from bot messages."""
-        try:
-            (member, message) = await self.maybe_get_reaction(payload)
-        except ValueError:
-            return
-        await self.handle_member_reaction(payload.emoji, member, message, "remove")
+        self.dispatch_reaction(payload, "remove")
@@ -0,0 +1,75 @@
+"""Module for registries of locks by key."""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Hashable
+
+from .common import LOG
+
+# Most locks expected to be held or awaited at once in a registry.
+MAX_LOCKS = 1000
+
+
+class KeyedLocks:
+    """Locks by key (e.g. message or user id), created on demand.
+
+    A lock only exists while a task holds or awaits it: when released with
+    no other task waiting, it is freed, so the registry never grows beyond
+    the keys in use. Tasks locking the same key at the same time share one
+    lock, exactly as with a lock kept for good.
+
+    A lock in use can't be freed, so the size cap isn't enforced by
+    eviction; going over it is counted and logged, as it means tasks are
+    piling up on locks that aren't being released.
+    """
+
+    def __init__(self, metrics, name: str, max_locks=MAX_LOCKS):
+        self.metrics = metrics
+        self.name = name
+        self.max_locks = max_locks
+        self._locks = {}
+        self._over_cap = False
+
+    def __len__(self):
+        return len(self._locks)
+
+    def locked(self, key: Hashable):
+        """Return True if the lock for the key is held."""
+        entry = self._locks.get(key)
+        return entry is not None and entry[0].locked()
+
+    @asynccontextmanager
+    async def lock(self, key: Hashable):
+        """Hold the lock for the key, creating it if needed."""
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+            self.metrics.incr(f"{self.name}.created")
+            self._check_size()
+        elif entry[0].locked():
+            self.metrics.incr(f"{self.name}.contended")
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+                self.metrics.incr(f"{self.name}.freed")
+            self.metrics.gauge(f"{self.name}.size", len(self._locks))
+
+    def _check_size(self):
+        size = len(self._locks)
+        self.metrics.gauge(f"{self.name}.size", size)
+        if size > self.max_locks:
+            self.metrics.incr(f"{self.name}.over_cap")
+            if not self._over_cap:
+                LOG.warning(
+                    "%s: %d locks in use, over cap of %d",
+                    self.name,
+                    size,
+                    self.max_locks,
+                )
+            self._over_cap = True
+        else:
+            self._over_cap = False
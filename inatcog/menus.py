@@ -0,0 +1,118 @@
+"""Module for menus with pages rendered on demand."""
+import asyncio
+import contextlib
+from typing import Awaitable, Callable
+
+import discord
+from redbot.core.utils.menus import start_adding_reactions
+from redbot.core.utils.predicates import ReactionPredicate
+
+# Pages rendered ahead of the page shown, in the direction of travel.
+LOOKAHEAD_PAGES = 1
+# Menu controls, as in Red's DEFAULT_CONTROLS.
+PREV_PAGE = "\N{LEFTWARDS BLACK ARROW}\N{VARIATION SELECTOR-16}"
+CLOSE_MENU = "\N{CROSS MARK}"
+NEXT_PAGE = "\N{BLACK RIGHTWARDS ARROW}\N{VARIATION SELECTOR-16}"
+MENU_CONTROLS = (PREV_PAGE, CLOSE_MENU, NEXT_PAGE)
+# Seconds to wait for a control to be used before the menu is left as is.
+MENU_TIMEOUT = 30.0
+
+
+class LazyPages:
+    """Menu pages rendered only when about to be shown.
+
+    The number of pages is given up front (e.g. from the number of entries
+    in config, or the total results of a first query) so that titles can
+    say "page 1 of N" without rendering every page. Pages are rendered by
+    `fetch`, which `lazy_menu` calls before each page is shown.
+    """
+
+    def __init__(
+        self,
+        count: int,
+        render: Callable[[int], Awaitable[discord.Embed]],
+        lookahead=LOOKAHEAD_PAGES,
+    ):
+        self.count = count
+        self.render = render
+        self.lookahead = lookahead
+        self._pages = {}
+
+    def __len__(self):
+        return self.count
+
+    def _start(self, index: int):
+        task = self._pages.get(index)
+        if task is None:
+            task = self._pages[index] = asyncio.ensure_future(self.render(index))
+            # A failed lookahead is only reported if the page is shown:
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return task
+
+    async def fetch(self, index: int, step=1):
+        """Render the page at index, and start rendering the pages after it.
+
+        Parameters
+        ----------
+        index: int
+            The page to render.
+        step: int, optional
+            Direction of travel: 1 for forward, -1 for back.
+        """
+        index %= self.count
+        task = self._start(index)
+        for ahead in range(1, self.lookahead + 1):
+            self._start((index + step * ahead) % self.count)
+        try:
+            return await task
+        except Exception:
+            # Try again next time the page is fetched.
+            del self._pages[index]
+            raise
+
+    def cancel(self):
+        """Cancel rendering of pages not rendered yet."""
+        for task in self._pages.values():
+            task.cancel()
+
+
+async def lazy_menu(ctx, pages: LazyPages, timeout=MENU_TIMEOUT):
+    """Show a menu of lazily rendered pages, starting with the first.
+
+    Works like Red's `menu()` with its default controls, but renders each
+    page only when it is about to be shown, as `menu()` needs all of its
+    pages up front.
+    """
+    page = 0
+    try:
+        message = await ctx.send(embed=await pages.fetch(page))
+        controls = MENU_CONTROLS if len(pages) > 1 else (CLOSE_MENU,)
+        start_adding_reactions(message, controls)
+        while True:
+            try:
+                (reaction, _user) = await ctx.bot.wait_for(
+                    "reaction_add",
+                    check=ReactionPredicate.with_emojis(controls, message, ctx.author),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                with contextlib.suppress(discord.HTTPException):
+                    await message.clear_reactions()
+                return
+            emoji = str(reaction.emoji)
+            if emoji == CLOSE_MENU:
+                with contextlib.suppress(discord.HTTPException):
+                    await message.delete()
+                return
+            step = 1 if emoji == NEXT_PAGE else -1
+            page = (page + step) % len(pages)
+            embed = await pages.fetch(page, step)
+            if message.channel.permissions_for(ctx.me).manage_messages:
+                with contextlib.suppress(discord.HTTPException):
+                    await message.remove_reaction(emoji, ctx.author)
+            try:
+                await message.edit(embed=embed)
+            except discord.NotFound:
+                return
+    finally:
+        pages.cancel()
@@ -0,0 +1,58 @@
+"""Module for runtime metrics."""
+from collections import Counter
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class Metrics:
+    """Counters and timings of cog internals, e.g. cache hits & misses."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.gauges = {}
+        self.timings = {}
+
+    def incr(self, name: str, count: int = 1):
+        """Increment a counter."""
+        self.counters[name] += count
+
+    def gauge(self, name: str, value: int):
+        """Set the current value of a gauge, keeping its peak."""
+        peak = self.gauges.get(name, (0, 0))[1]
+        self.gauges[name] = (value, max(peak, value))
+
+    def add_timing(self, name: str, elapsed: float):
+        """Add elapsed seconds to a timing."""
+        count, total = self.timings.get(name, (0, 0.0))
+        self.timings[name] = (count + 1, total + elapsed)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_timing(name, perf_counter() - start)
+
+    def format(self):
+        """Format all metrics, one per line.
+
+        A hit rate is shown for each pair of counters named `*.hit` and
+        `*.miss`.
+        """
+        lines = []
+        for name in sorted(self.counters):
+            line = f"{name}: {self.counters[name]}"
+            if name.endswith(".hit"):
+                misses = self.counters.get(name[: -len(".hit")] + ".miss", 0)
+                total = self.counters[name] + misses
+                line += f" ({self.counters[name] / total:.1%})"
+            lines.append(line)
+        for name in sorted(self.gauges):
+            value, peak = self.gauges[name]
+            lines.append(f"{name}: {value} (peak {peak})")
+        for name in sorted(self.timings):
+            count, total = self.timings[name]
+            lines.append(f"{name}: {count} × {total / count * 1000:.3f} ms")
+        return "\n".join(lines)
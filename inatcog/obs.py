@@ -1,9 +1,12 @@
 """Module to work with iNat observations."""
 
+from functools import cached_property
 import re
-from typing import List, NamedTuple
+from time import time
+from typing import List, Optional, Tuple
 
 from .api import WWW_BASE_URL, WWW_URL_PAT
+from .scanner import scan_message, ScanMatch
 from .taxa import Taxon, get_taxon_fields
 from .users import User
 
@@ -15,6 +18,11 @@ PAT_OBS_LINK = re.compile(
     r")\b",
     re.I,
 )
+# Most observations matched in one message.
+MAX_OBS_PER_MESSAGE = 10
+# Default seconds to cache observations (see INatObsQuery).
+OBS_CACHE_TTL = 60
+MAX_CACHED_OBS = 500
 # Match observation URL from `obs` embed generated for observations matching a
 # specific taxon_id and filtered by optional place_id and/or user_id.
 PAT_OBS_TAXON_LINK = re.compile(
@@ -24,55 +32,82 @@ PAT_OBS_TAXON_LINK = re.compile(
 )
 
 
-class Obs(NamedTuple):
-    """An observation."""
-
-    taxon: Taxon or None
-    community_taxon: Taxon or None
-    obs_id: int
-    obs_on: str
-    obs_at: str
-    user: User
-    thumbnail: str
-    images: List[str]
-    quality_grade: str
-    idents_agree: int
-    idents_count: int
-    faves_count: int
-    comments_count: int
-    description: str
-    project_ids: list
-    sound: str
-    sounds: List[str]
+class Obs:
+    """An observation, decoded lazily from its JSON record.
 
+    Fields are only decoded when first used, so e.g. image-only and map
+    embeds don't pay for counting identifications or decoding taxa.
+    The record is never modified.
+    """
 
-def get_obs_fields(obs):
-    """Get an Obs from get_observations JSON record.
+    def __init__(self, record: dict):
+        self.record = record
 
-    Parameters
-    ----------
-    obs: dict
-        A JSON observation record from /v1/observations or other endpoint
-        returning observations.
+    @property
+    def obs_id(self) -> int:
+        """Observation id."""
+        return self.record["id"]
 
-    Returns
-    -------
-    Obs
-        An Obs object from the JSON results.
-    """
+    @property
+    def obs_on(self) -> str:
+        """When observed, as entered by the observer."""
+        return self.record["observed_on_string"]
+
+    @property
+    def obs_at(self) -> str:
+        """Where observed, as entered by the observer."""
+        return self.record["place_guess"]
+
+    @property
+    def quality_grade(self) -> str:
+        """Quality grade."""
+        return self.record["quality_grade"]
+
+    @property
+    def faves_count(self) -> int:
+        """Number of faves."""
+        return self.record["faves_count"]
+
+    @property
+    def comments_count(self) -> int:
+        """Number of comments."""
+        return self.record["comments_count"]
+
+    @property
+    def description(self) -> str:
+        """Description (HTML)."""
+        return self.record["description"]
 
-    def count_community_id(obs, community_taxon):
+    @cached_property
+    def taxon(self) -> Optional[Taxon]:
+        """Observation taxon."""
+        obs_taxon = self.record.get("taxon")
+        return get_taxon_fields(obs_taxon) if obs_taxon else None
+
+    @cached_property
+    def community_taxon(self) -> Optional[Taxon]:
+        """Community taxon."""
+        obs_community_taxon = self.record.get("community_taxon")
+        return get_taxon_fields(obs_community_taxon) if obs_community_taxon else None
+
+    @cached_property
+    def _community_id_counts(self) -> Tuple[int, int]:
         idents_count = 0
         idents_agree = 0
+        community_taxon = self.record.get("community_taxon")
+        if not community_taxon:
+            return (idents_count, idents_agree)
 
-        ident_taxon_ids = obs["ident_taxon_ids"]
-
-        for identification in obs["identifications"]:
+        community_taxon_id = community_taxon["id"]
+        ident_taxon_ids = set(self.record["ident_taxon_ids"])
+        for identification in self.record["identifications"]:
             if identification["current"]:
-                user_taxon_id = identification["taxon"]["id"]
-                user_taxon_ids = identification["taxon"]["ancestor_ids"]
-                user_taxon_ids.append(user_taxon_id)
-                if community_taxon["id"] in user_taxon_ids:
+                user_taxon = identification["taxon"]
+                user_taxon_id = user_taxon["id"]
+                if (
+                    user_taxon_id == community_taxon_id
+                    or community_taxon_id in user_taxon["ancestor_ids"]
+                ):
                     if user_taxon_id in ident_taxon_ids:
                         # Count towards total & agree:
                         idents_count += 1
@@ -86,79 +121,188 @@ def get_obs_fields(obs):
 
         return (idents_count, idents_agree)
 
-    obs_taxon = obs.get("taxon")
-    if obs_taxon:
-        taxon = get_taxon_fields(obs_taxon)
-    else:
-        taxon = None
-    obs_community_taxon = obs.get("community_taxon")
-    idents_count = idents_agree = 0
-    if obs_community_taxon:
-        (idents_count, idents_agree) = count_community_id(obs, obs_community_taxon)
-        community_taxon = get_taxon_fields(obs_community_taxon)
-    else:
-        community_taxon = None
-
-    user = User.from_dict(obs["user"])
-
-    photos = obs.get("photos") or []
-    images = [re.sub("/square", "/original", photo.get("url")) for photo in photos]
-    if photos:
-        thumbnail = photos[0].get("url")
-    else:
-        thumbnail = ""
-
-    sounds = obs.get("sounds")
-    if sounds:
-        sound = sounds[0].get("file_url")
-        sound_urls = [sound.get("file_url") for sound in sounds]
-    else:
-        sound = ""
-        sound_urls = []
-    project_ids = obs["project_ids"]
-    non_traditional_projects = obs.get("non_traditional_projects")
-    if non_traditional_projects:
-        project_ids += [project["project_id"] for project in non_traditional_projects]
-
-    return Obs(
-        taxon,
-        community_taxon,
-        obs["id"],
-        obs["observed_on_string"],
-        obs["place_guess"],
-        user,
-        thumbnail,
-        images,
-        obs["quality_grade"],
-        idents_agree,
-        idents_count,
-        obs["faves_count"],
-        obs["comments_count"],
-        obs["description"],
-        obs["project_ids"],
-        sound,
-        sound_urls,
-    )
-
-
-async def maybe_match_obs(api, content, id_permitted=False):
-    """Maybe retrieve an observation from content."""
-    mat = re.search(PAT_OBS_LINK, content)
-    obs = url = obs_id = None
-    if mat:
-        obs_id = int(mat["obs_id"] or mat["cmd_obs_id"])
-        url = mat["url"] or WWW_BASE_URL + "/observations/" + str(obs_id)
-
-    if id_permitted:
-        try:
-            obs_id = int(content)
-        except ValueError:
-            pass
-    if obs_id:
-        results = (await api.get_observations(obs_id, include_new_projects=1))[
-            "results"
+    @property
+    def idents_count(self) -> int:
+        """Identifications counting for or against the community taxon."""
+        return self._community_id_counts[0]
+
+    @property
+    def idents_agree(self) -> int:
+        """Identifications agreeing with the community taxon."""
+        return self._community_id_counts[1]
+
+    @cached_property
+    def user(self) -> User:
+        """Observer."""
+        return User.from_dict(self.record["user"])
+
+    @cached_property
+    def images(self) -> List[str]:
+        """Original size image urls."""
+        photos = self.record.get("photos") or []
+        return [photo.get("url").replace("/square", "/original") for photo in photos]
+
+    @property
+    def thumbnail(self) -> str:
+        """Thumbnail url of the first image, if any."""
+        photos = self.record.get("photos")
+        return photos[0].get("url") if photos else ""
+
+    @property
+    def sound(self) -> str:
+        """Url of the first sound, if any."""
+        sounds = self.record.get("sounds")
+        return sounds[0].get("file_url") if sounds else ""
+
+    @cached_property
+    def sounds(self) -> List[str]:
+        """Sound urls."""
+        sounds = self.record.get("sounds") or []
+        return [sound.get("file_url") for sound in sounds]
+
+    @cached_property
+    def project_ids(self) -> List[int]:
+        """Ids of traditional & non-traditional projects including it."""
+        non_traditional_projects = self.record.get("non_traditional_projects") or []
+        return self.record["project_ids"] + [
+            project["project_id"] for project in non_traditional_projects
         ]
-        obs = get_obs_fields(results[0]) if results else None
-    if obs_id and not url:
-        url = WWW_BASE_URL + "/observations/" + str(obs_id)
-    return (obs, url)
+
+
+def get_obs_fields(obs):
+    """Get an Obs from get_observations JSON record.
+
+    Parameters
+    ----------
+    obs: dict
+        A JSON observation record from /v1/observations or other endpoint
+        returning observations.
+
+    Returns
+    -------
+    Obs
+        An Obs object from the JSON results.
+    """
+    return Obs(obs)
+
+
+def get_obs_link_urls(matches: List[ScanMatch]):
+    """Get url for each distinct observation linked in scanned matches.
+
+    Returns
+    -------
+    dict
+        Url keyed by observation id in the order first mentioned, up to
+        MAX_OBS_PER_MESSAGE.
+    """
+    urls = {}
+    for (kind, mat) in matches:
+        if kind != "obs":
+            continue
+        obs_id = int(mat["obs_id"] or mat["cmd_obs_id"])
+        if obs_id not in urls:
+            urls[obs_id] = mat["url"] or WWW_BASE_URL + "/observations/" + str(obs_id)
+            if len(urls) == MAX_OBS_PER_MESSAGE:
+                break
+    return urls
+
+
+class INatObsQuery:
+    """Query iNat for observations, caching them for a short while.
+
+    The cache lets follow-up commands on the same observation (e.g. `last
+    obs`, then `last obs img`, `last obs map`) answer without more requests.
+    """
+
+    def __init__(self, cog, ttl=OBS_CACHE_TTL):
+        self.cog = cog
+        self.ttl = ttl
+        self.cache = {}
+
+    def _get_cached(self, obs_id: int):
+        cached = self.cache.get(obs_id)
+        if cached:
+            (cached_at, obs) = cached
+            if time() - cached_at < self.ttl:
+                return obs
+            del self.cache[obs_id]
+        return None
+
+    def _set_cached(self, obs: Obs):
+        self.cache.pop(obs.obs_id, None)
+        self.cache[obs.obs_id] = (time(), obs)
+        if len(self.cache) > MAX_CACHED_OBS:
+            now = time()
+            for obs_id, (cached_at, _obs) in list(self.cache.items()):
+                if now - cached_at >= self.ttl or len(self.cache) > MAX_CACHED_OBS:
+                    del self.cache[obs_id]
+
+    async def get_obs_by_ids(self, obs_ids: list, refresh_cache=False):
+        """Get observations for a list of ids with at most one request.
+
+        Returns
+        -------
+        dict
+            Obs for each id found, keyed by id.
+        """
+        obs_by_id = {}
+        if not refresh_cache:
+            for obs_id in obs_ids:
+                obs = self._get_cached(obs_id)
+                if obs:
+                    obs_by_id[obs_id] = obs
+        uncached_ids = [obs_id for obs_id in obs_ids if obs_id not in obs_by_id]
+        metrics = self.cog.metrics
+        metrics.incr("obs_cache.hit", len(obs_by_id))
+        metrics.incr("obs_cache.miss", len(uncached_ids))
+        if not uncached_ids:
+            return obs_by_id
+
+        response = await self.cog.api.get_observations(
+            ",".join(map(str, uncached_ids)), include_new_projects=1
+        )
+        results = (response and response.get("results")) or []
+        for result in results:
+            obs = get_obs_fields(result)
+            self._set_cached(obs)
+            obs_by_id[obs.obs_id] = obs
+        return obs_by_id
+
+    async def get_obs(self, obs_id: int, refresh_cache=False):
+        """Get an observation by id, if found."""
+        obs_by_id = await self.get_obs_by_ids([obs_id], refresh_cache)
+        return obs_by_id.get(obs_id)
+
+    async def get_obs_list(self, urls: dict, refresh_cache=False):
+        """Get observations for urls keyed by observation id.
+
+        Returns
+        -------
+        list
+            An (obs, url) tuple for each id in order; obs is None if not found.
+        """
+        obs_by_id = await self.get_obs_by_ids(list(urls), refresh_cache)
+        return [(obs_by_id.get(obs_id), url) for (obs_id, url) in urls.items()]
+
+    async def maybe_match_obs_list(
+        self, content, id_permitted=False, refresh_cache=False
+    ):
+        """Maybe retrieve all observations linked to in content.
+
+        Returns
+        -------
+        list
+            An (obs, url) tuple for each distinct observation id in the order
+            first mentioned, up to MAX_OBS_PER_MESSAGE; obs is None if not
+            found.
+        """
+        urls = get_obs_link_urls(scan_message(content))
+
+        if id_permitted:
+            try:
+                obs_id = int(content)
+                urls = {obs_id: WWW_BASE_URL + "/observations/" + str(obs_id)}
+            except ValueError:
+                pass
+
+        return await self.get_obs_list(urls, refresh_cache)
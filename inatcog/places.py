@@ -1,7 +1,6 @@
 """Module to handle users."""
 from typing import Union
-from dataclasses import dataclass, field
-from dataclasses_json import config, DataClassJsonMixin
+from dataclasses import dataclass
 from .api import WWW_BASE_URL
 from .converters import QuotedContextMemberConverter
 
@@ -10,16 +9,23 @@ RESERVED_PLACES = ["home", "none", "clear", "all", "any"]
 
 
 @dataclass
-class Place(DataClassJsonMixin):
+class Place:
     """An iNat place."""
 
+    __slots__ = ("display_name", "place_id")
+
     display_name: str
-    place_id: int = field(metadata=config(field_name="id"))
-    url: str = field(init=False)
+    place_id: int
 
-    def __post_init__(self):
+    @property
+    def url(self):
         """URL for place."""
-        self.url = f"{WWW_BASE_URL}/places/{self.place_id}"
+        return f"{WWW_BASE_URL}/places/{self.place_id}"
+
+    @classmethod
+    def from_dict(cls, record: dict):
+        """Make a place from a JSON place record."""
+        return cls(record.get("display_name"), record["id"])
 
 
 class INatPlaceTable:
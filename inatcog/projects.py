@@ -1,28 +1,47 @@
 """Module to handle projects."""
-from dataclasses import dataclass, field
-from typing import List, Union
-from dataclasses_json import config, DataClassJsonMixin
+from dataclasses import dataclass
+from time import time
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Union
 from .api import WWW_BASE_URL
 
+# Default seconds to cache project leaderboards (see get_leaderboard).
+LEADERBOARD_TTL = 300
+
 
 @dataclass
-class Project(DataClassJsonMixin):
+class Project:
     """A project."""
 
-    project_id: int = field(metadata=config(field_name="id"))
+    __slots__ = ("project_id", "title")
+
+    project_id: int
     title: str
-    url: str = field(init=False)
 
-    def __post_init__(self):
+    @property
+    def url(self):
         """URL for project."""
-        self.url = f"{WWW_BASE_URL}/projects/{self.project_id}"
+        return f"{WWW_BASE_URL}/projects/{self.project_id}"
+
+    @classmethod
+    def from_dict(cls, record: dict):
+        """Make a project from a JSON project record."""
+        return cls(record["id"], record.get("title"))
 
 
 @dataclass
-class UserProject(DataClassJsonMixin):
+class UserProject:
     """A collection project for observations by specific users."""
 
-    project_id: int = field(metadata=config(field_name="id"))
+    __slots__ = (
+        "project_id",
+        "title",
+        "user_ids",
+        "project_observation_rules",
+        "project_type",
+        "_observed_by_ids",
+    )
+
+    project_id: int
     title: str
     user_ids: List
     project_observation_rules: List
@@ -31,30 +50,131 @@ class UserProject(DataClassJsonMixin):
     def __post_init__(self):
         if self.project_type != "collection":
             raise TypeError
-
-    def observed_by_ids(self):
-        """The 'must be observed by' rule user ids."""
-        return [
+        self._observed_by_ids = frozenset(
             rule["operand_id"]
-            for rule in self.project_observation_rules
+            for rule in self.project_observation_rules or ()
             if rule["operator"] == "observed_by_user?"
-        ]
+        )
+
+    @classmethod
+    def from_dict(cls, record: dict):
+        """Make a user project from a JSON project record."""
+        return cls(
+            record["id"],
+            record.get("title"),
+            record.get("user_ids"),
+            record.get("project_observation_rules"),
+            record.get("project_type"),
+        )
+
+    def observed_by_ids(self) -> FrozenSet[int]:
+        """The 'must be observed by' rule user ids."""
+        return self._observed_by_ids
 
 
 @dataclass
-class ObserverStats(DataClassJsonMixin):
+class ObserverStats:
     """The stats for an observer from a set of observers (as from a project)."""
 
+    __slots__ = ("user_id", "observation_count", "species_count")
+
     user_id: int
     observation_count: int
     species_count: int
 
+    @classmethod
+    def from_dict(cls, record: dict):
+        """Make observer stats from a JSON observers record."""
+        return cls(
+            record["user_id"], record["observation_count"], record["species_count"]
+        )
+
+
+class Leaderboard(NamedTuple):
+    """Observers of a project in rank order, with each observer's rank."""
+
+    stats: List[ObserverStats]
+    ranks: Dict[int, int]
+
+    @classmethod
+    def from_results(cls, results: list):
+        """Make a leaderboard from /v1/observations/observers results."""
+        stats = [ObserverStats.from_dict(observer) for observer in results]
+        ranks = {}
+        for (index, observer) in enumerate(stats, start=1):
+            ranks.setdefault(observer.user_id, index)
+        return cls(stats, ranks)
+
+    def get_rank(self, user_id: int) -> Optional[int]:
+        """Get rank of user, if on the leaderboard."""
+        return self.ranks.get(user_id)
+
 
 class INatProjectTable:
     """Lookup helper for projects."""
 
-    def __init__(self, cog):
+    def __init__(self, cog, leaderboard_ttl=LEADERBOARD_TTL):
         self.cog = cog
+        self.leaderboard_ttl = leaderboard_ttl
+        self.leaderboards = {}
+        self.user_projects = {}
+        self.projects_by_user = {}
+
+    def index_user_projects(self, user_projects: Iterable[UserProject]):
+        """Index user projects by the users they are observed by.
+
+        Call with user projects each time they are fetched, so the index
+        is refreshed along with the project cache.
+        """
+        for user_project in user_projects:
+            project_id = user_project.project_id
+            old_user_project = self.user_projects.get(project_id)
+            if old_user_project:
+                for user_id in old_user_project.observed_by_ids():
+                    project_ids = self.projects_by_user[user_id]
+                    project_ids.discard(project_id)
+                    if not project_ids:
+                        del self.projects_by_user[user_id]
+            self.user_projects[project_id] = user_project
+            for user_id in user_project.observed_by_ids():
+                self.projects_by_user.setdefault(user_id, set()).add(project_id)
+
+    def get_user_project_ids(self, user_id: int) -> FrozenSet[int]:
+        """Get ids of indexed user projects the user is observed by."""
+        return frozenset(self.projects_by_user.get(user_id, ()))
+
+    async def get_leaderboard(self, project_id: int, order_by: str = None):
+        """Get project leaderboard, cached for a short while.
+
+        The cache lets users compare stats without a request for each
+        command, while not going stale for long.
+
+        Parameters
+        ----------
+        order_by: str, optional
+            "species_count" to rank by species instead of observations.
+        """
+        key = (project_id, order_by)
+        cached = self.leaderboards.get(key)
+        if cached:
+            (cached_at, leaderboard) = cached
+            if time() - cached_at < self.leaderboard_ttl:
+                self.cog.metrics.incr("leaderboard_cache.hit")
+                return leaderboard
+            del self.leaderboards[key]
+        self.cog.metrics.incr("leaderboard_cache.miss")
+
+        kwargs = {"order_by": order_by} if order_by else {}
+        # Leaderboards for many projects may be fetched at once (e.g. user stats):
+        async with self.cog.api.fan_out():
+            response = await self.cog.api.get_project_observers_stats(
+                project_id=project_id, **kwargs
+            )
+        if not response:
+            return Leaderboard([], {})
+        leaderboard = Leaderboard.from_results(response["results"])
+        self.leaderboards[key] = (time(), leaderboard)
+        return leaderboard
 
     async def get_project(self, guild, query: Union[int, str]):
         """Get project by guild abbr or via id#/keyword lookup in API."""
@@ -0,0 +1,339 @@
+"""Module for reactions to our embeds."""
+import asyncio
+from collections import OrderedDict
+from copy import copy
+import re
+
+import discord
+
+from .common import LOG
+from .obs import PAT_OBS_TAXON_LINK
+from .taxa import (
+    format_place_taxon_counts,
+    format_user_taxon_counts,
+    get_taxon,
+    PAT_TAXON_LINK,
+    TAXON_COUNTS_HEADER,
+    TAXON_PLACES_HEADER,
+)
+
+# Reactions added as controls to taxon & counts embeds.
+REACTION_EMOJIS = ("#️⃣", "📝", "🏠", "📍")
+# Most of our recent embed messages indexed.
+MAX_REACTION_MESSAGES = 1000
+# Seconds to collect reaction changes to a counts embed before editing it.
+REACTION_DEBOUNCE = 2.0
+USER_TOTAL_FOOTER = (
+    "User counts may not add up to "
+    "the total if they changed since they were added. "
+    "Remove, then add them again to update their counts."
+)
+PLACE_TOTAL_FOOTER = (
+    "Non-overlapping place counts may not add up to "
+    "the total if they changed since they were added. "
+    "Remove, then add them again to update their counts."
+)
+# Match a line of observation counts for a place or user.
+PAT_COUNTS_LINE = re.compile(r"\[[0-9 \(\)]+\]\((?P<url>.*?)\) (?P<name>.*?) ?$")
+
+
+class MessageLRU:
+    """Values for our recent messages, keyed by message id."""
+
+    def __init__(self, maxlen=MAX_REACTION_MESSAGES):
+        self.maxlen = maxlen
+        self.values = OrderedDict()
+
+    def __len__(self):
+        return len(self.values)
+
+    def set(self, message_id: int, value):
+        """Set the value for a message, evicting the least recently used if full."""
+        self.values[message_id] = value
+        self.values.move_to_end(message_id)
+        if len(self.values) > self.maxlen:
+            self.values.popitem(last=False)
+
+    def get(self, message_id: int):
+        """Get the value for a message, if any."""
+        value = self.values.get(message_id)
+        if value is not None:
+            self.values.move_to_end(message_id)
+        return value
+
+    def remove(self, message_id: int):
+        """Remove the value for a message, if any."""
+        self.values.pop(message_id, None)
+
+
+class ReactionMessages(MessageLRU):
+    """Index of our recent embed messages by id, so reacted ones are found fast.
+
+    Messages are added as they are received from the gateway, so they are the
+    same objects discord.py keeps up to date as they are edited while they
+    remain in its message cache. A message edited after it has left that
+    cache must be removed, as its copy here is then out of date.
+    """
+
+    def add(self, message: discord.Message):
+        """Add a message."""
+        self.set(message.id, message)
+
+
+class CountsEmbed:
+    """Observation counts listed in a taxon or counts embed.
+
+    Counts for places & users are kept in the order listed, keyed by place id
+    and user login, along with the total for each if more than one is
+    listed. The embed description is rendered from this, so reactions that
+    add or remove counts needn't parse the description again.
+    """
+
+    def __init__(self, taxon_id: int, place_id=None, user_id=None, head=""):
+        self.taxon_id = taxon_id
+        self.place_id = place_id
+        self.user_id = user_id
+        self.head = head
+        self.places = OrderedDict()
+        self.place_total = None
+        self.users = OrderedDict()
+        self.user_total = None
+
+    def render(self):
+        """Render the embed description."""
+        description = self.head
+        for (header, counts, total) in (
+            (TAXON_PLACES_HEADER, self.places, self.place_total),
+            (TAXON_COUNTS_HEADER, self.users, self.user_total),
+        ):
+            if counts:
+                description += f"\n{header}"
+                for line in counts.values():
+                    description += f"\n{line}"
+                if total:
+                    description += f"\n{total}"
+        return description
+
+    @classmethod
+    def from_embed(cls, embed: discord.Embed):
+        """Parse counts from an embed, if it is for a taxon.
+
+        Returns
+        -------
+        CountsEmbed
+            The counts, or None if the embed url is not for a taxon.
+        """
+        url = embed.url
+        mat = url and (
+            re.match(PAT_TAXON_LINK, url) or re.match(PAT_OBS_TAXON_LINK, url)
+        )
+        if not mat:
+            return None
+        groups = mat.groupdict()
+        counts_embed = cls(
+            int(mat["taxon_id"]), groups.get("place_id"), groups.get("user_id")
+        )
+
+        lines = (embed.description or "").split("\n")
+        head = []
+        counts = None
+        for line in lines:
+            if line == TAXON_PLACES_HEADER:
+                counts = counts_embed.places
+                continue
+            if line == TAXON_COUNTS_HEADER:
+                counts = counts_embed.users
+                continue
+            mat = counts is not None and re.match(PAT_COUNTS_LINE, line)
+            if not mat:
+                if counts is None:
+                    head.append(line)
+                continue
+            is_places = counts is counts_embed.places
+            if mat["name"] == "*total*":
+                if is_places:
+                    counts_embed.place_total = line
+                else:
+                    counts_embed.user_total = line
+            elif is_places:
+                place_mat = re.search(r"[?&]place_id=(\d+)", mat["url"])
+                if place_mat:
+                    counts[int(place_mat[1])] = line
+            else:
+                counts[mat["name"]] = line
+        counts_embed.head = "\n".join(head)
+        return counts_embed
+
+
+class CountsEmbeds(MessageLRU):
+    """Counts for our recent taxon & counts embeds, keyed by message id."""
+
+
+class INatCountsEditor:
+    """Apply reaction changes to counts embeds in debounced batches.
+
+    Changes to an embed made within a short window are collected, then
+    applied together: the counts for all places & users added are fetched
+    at once and the message is edited only once. A change undone within
+    the window (e.g. a reaction added, then removed) is dropped.
+
+    Changes being applied count as listed until the edit is done, so a
+    change made meanwhile is decided against them and applied after.
+    """
+
+    def __init__(self, cog, delay=REACTION_DEBOUNCE):
+        self.cog = cog
+        self.delay = delay
+        self.pending = {}
+        self.applying = {}
+        self.tasks = {}
+
+    def is_listed(self, message_id: int, counts: CountsEmbed, kind: str, key):
+        """Return True if place or user is listed once pending changes apply."""
+        for changes in (self.pending, self.applying):
+            change = changes.get(message_id, {}).get((kind, key))
+            if change:
+                return change[0] == "add"
+        return key in getattr(counts, kind)
+
+    def has_entries(self, message_id: int, counts: CountsEmbed, kind: str):
+        """Return True if any places or users are listed once changes apply."""
+        keys = set(getattr(counts, kind))
+        for changes in (self.pending, self.applying):
+            keys.update(
+                key
+                for (change_kind, key) in changes.get(message_id, {})
+                if change_kind == kind
+            )
+        return any(self.is_listed(message_id, counts, kind, key) for key in keys)
+
+    def change(self, msg, counts: CountsEmbed, kind: str, subject, action: str):
+        """Add, remove or toggle a place or user.
+
+        Parameters
+        ----------
+        msg: discord.Message
+            The counts embed message.
+        counts: CountsEmbed
+            The counts for the message.
+        kind: str
+            Either "places" or "users".
+        subject: Union[Place, User]
+            The place or user to change.
+        action: str
+            One of "add", "remove" or "toggle".
+        """
+        key = subject.place_id if kind == "places" else subject.login
+        listed = self.is_listed(msg.id, counts, kind, key)
+        if action == "toggle":
+            action = "remove" if listed else "add"
+        if listed == (action == "add"):
+            return
+
+        changes = self.pending.setdefault(msg.id, OrderedDict())
+        if (kind, key) in changes:
+            # Undoes the pending change.
+            del changes[(kind, key)]
+        else:
+            changes[(kind, key)] = (action, subject)
+        if msg.id not in self.tasks:
+            self.tasks[msg.id] = asyncio.ensure_future(self._apply_later(msg, counts))
+
+    async def _apply_later(self, msg, counts: CountsEmbed):
+        await asyncio.sleep(self.delay)
+        del self.tasks[msg.id]
+        async with self.cog.reaction_locks.lock(msg.id):
+            try:
+                await self.apply(msg, counts)
+            except Exception:  # pylint: disable=broad-except
+                LOG.exception("Counts not updated for message %d", msg.id)
+
+    async def apply(self, msg, counts: CountsEmbed):
+        """Apply pending changes to the counts and edit the message once.
+
+        The counts are only changed once the message is edited, so if any
+        counts can't be fetched, they still match the message.
+        """
+        changes = self.pending.pop(msg.id, None)
+        if not changes:
+            return
+        self.applying[msg.id] = changes
+        try:
+            await self._apply(msg, counts, changes)
+        finally:
+            self.applying.pop(msg.id, None)
+
+    async def _apply(self, msg, counts: CountsEmbed, changes: OrderedDict):
+        taxon = await get_taxon(self.cog, counts.taxon_id)
+
+        async def format_counts(kind, subject):
+            async with self.cog.api.request_slots:
+                if kind == "places":
+                    return await format_place_taxon_counts(
+                        self.cog, subject, taxon, counts.user_id
+                    )
+                return await format_user_taxon_counts(
+                    self.cog, subject, taxon, counts.place_id
+                )
+
+        updated = copy(counts)
+        updated.places = OrderedDict(counts.places)
+        updated.users = OrderedDict(counts.users)
+        added = []
+        for ((kind, key), (action, subject)) in changes.items():
+            if action == "remove":
+                getattr(updated, kind).pop(key, None)
+            else:
+                added.append((kind, key, subject))
+        formatted = await asyncio.gather(
+            *(format_counts(kind, subject) for (kind, _key, subject) in added)
+        )
+        for ((kind, key, _subject), formatted_counts) in zip(added, formatted):
+            if formatted_counts:
+                getattr(updated, kind)[key] = formatted_counts
+
+        # Totals added only if more than one place or user:
+        kinds = {kind for (kind, _key) in changes}
+        if "places" in kinds:
+            updated.place_total = None
+        if "users" in kinds:
+            updated.user_total = None
+        totals = [
+            (kind, ",".join(str(key) for key in getattr(updated, kind)))
+            for kind in kinds
+            if len(getattr(updated, kind)) > 1
+        ]
+        formatted = await asyncio.gather(
+            *(format_counts(kind, keys) for (kind, keys) in totals)
+        )
+        for ((kind, _keys), formatted_total) in zip(totals, formatted):
+            if kind == "places":
+                updated.place_total = formatted_total
+            else:
+                updated.user_total = formatted_total
+
+        embed = msg.embeds[0].copy()
+        embed.description = updated.render()
+        if updated.user_total:
+            embed.set_footer(text=USER_TOTAL_FOOTER)
+        elif updated.place_total:
+            embed.set_footer(text=PLACE_TOTAL_FOOTER)
+        else:
+            embed.set_footer(text="")
+        try:
+            await msg.edit(embed=embed)
+        except discord.errors.NotFound:
+            self.cog.counts_embeds.remove(msg.id)
+            return
+        counts.places = updated.places
+        counts.place_total = updated.place_total
+        counts.users = updated.users
+        counts.user_total = updated.user_total
+
+    def cancel(self):
+        """Cancel all pending changes."""
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+        self.pending.clear()
+        self.applying.clear()
@@ -0,0 +1,93 @@
+"""Module for in-memory index of iNat user registrations."""
+from typing import Dict, FrozenSet, NamedTuple, Optional
+
+
+class Registration(NamedTuple):
+    """A Discord user's iNat user registration."""
+
+    inat_user_id: Optional[int] = None
+    known_in: FrozenSet[int] = frozenset()
+    known_all: bool = False
+
+    def is_known_in(self, guild_id: int) -> bool:
+        """Return True if the registration is known in the guild."""
+        return bool(self.inat_user_id) and (self.known_all or guild_id in self.known_in)
+
+
+class UserRegistrations:
+    """Index of registrations by Discord & iNat id, so lookups needn't await Config.
+
+    Loaded once when the cog is initialized; commands changing registrations
+    write through to it after updating Config.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.guilds = {}
+        self.known_all = {}
+        self.discord_ids = {}
+
+    async def load(self, config):
+        """Load registrations of all users from Config."""
+        for (discord_id, values) in (await config.all_users()).items():
+            self.update_user(
+                int(discord_id),
+                inat_user_id=values["inat_user_id"],
+                known_in=values["known_in"],
+                known_all=values["known_all"],
+            )
+
+    def _index(self, discord_id: int, registration: Registration, add: bool):
+        inat_user_id = registration.inat_user_id
+        guild_ids = registration.known_in
+        indexes = [self.guilds.setdefault(guild_id, {}) for guild_id in guild_ids]
+        if registration.known_all:
+            indexes.append(self.known_all)
+        discord_ids = self.discord_ids.setdefault(inat_user_id, set())
+        if add:
+            for index in indexes:
+                index[discord_id] = inat_user_id
+            discord_ids.add(discord_id)
+            return
+        for index in indexes:
+            index.pop(discord_id, None)
+        discord_ids.discard(discord_id)
+        if not discord_ids:
+            del self.discord_ids[inat_user_id]
+        for guild_id in guild_ids:
+            if not self.guilds[guild_id]:
+                del self.guilds[guild_id]
+
+    def update_user(self, discord_id: int, **values):
+        """Update a user's registration after it is changed in Config."""
+        registration = self.users.get(discord_id)
+        if registration:
+            self._index(discord_id, registration, add=False)
+        else:
+            registration = Registration()
+        if "known_in" in values:
+            values["known_in"] = frozenset(values["known_in"] or ())
+        registration = registration._replace(**values)
+        if registration.inat_user_id:
+            self.users[discord_id] = registration
+            self._index(discord_id, registration, add=True)
+        else:
+            self.users.pop(discord_id, None)
+
+    def user(self, discord_id: int) -> Registration:
+        """Get a user's registration."""
+        return self.users.get(discord_id) or Registration()
+
+    def inat_user_id(self, guild_id: int, discord_id: int) -> Optional[int]:
+        """Get iNat user id for a Discord user if known in the guild."""
+        return self.guilds.get(guild_id, {}).get(discord_id) or self.known_all.get(
+            discord_id
+        )
+
+    def guild_users(self, guild_id: int) -> Dict[int, int]:
+        """Get iNat user id of each Discord user known in the guild."""
+        return {**self.known_all, **self.guilds.get(guild_id, {})}
+
+    def discord_users(self, inat_user_id: int) -> FrozenSet[int]:
+        """Get ids of Discord users registered as the iNat user."""
+        return frozenset(self.discord_ids.get(inat_user_id, ()))
@@ -0,0 +1,94 @@
+"""Module to scan messages for iNat links & triggers in a single pass."""
+import re
+from typing import List, Match, NamedTuple, Optional
+
+from .api import WWW_URL_PAT
+
+# At least one of these is in every message with a link or `obs` command.
+LINK_LITERALS = ("inaturalist", "naturalista", "biodiversity4all", "argentinat", "obs")
+
+# Match any link; each alternative's groups identify its kind:
+# - obs: observation link or `obs #` command (obs_id or cmd_obs_id)
+# - taxon: taxon link (taxon_id)
+# - user: user profile link (user_id or login)
+PAT_MESSAGE = re.compile(
+    r"\b(?P<url>" + WWW_URL_PAT + r"/("
+    r"observations/(?P<obs_id>\d+)"
+    r"|taxa/(?P<taxon_id>\d+)"
+    r"|(people|users)/((?P<user_id>\d+)|(?P<login>[a-z][-_a-z0-9]{2,39}))"
+    r"))\b"
+    r"|\b(?P<cmd>obs\s+(?P<cmd_obs_id>\d+))\b",
+    re.I,
+)
+# Match `.taxon.` lookup (query): minimum 4 characters, first dot must not
+# be followed by a space, and last dot must not be preceded by a space.
+# Scanned separately from links, as a lookup may span a link.
+PAT_DOT_TAXON = re.compile(
+    r"(^|(?<=\s))\.(?P<query>[^\s\.].{2,}?[^\s\.])\.(?=\s|$)", re.I
+)
+
+
+class ScanMatch(NamedTuple):
+    """A link or trigger found in a message."""
+
+    kind: str
+    match: Match
+
+
+def maybe_dot_taxon(content: str):
+    """Return True if content has a dot that could start a `.taxon.` lookup.
+
+    Like PAT_DOT_TAXON, the dot must be at the start or after any whitespace.
+    """
+    index = content.find(".")
+    while index != -1:
+        if not index or content[index - 1].isspace():
+            return True
+        index = content.find(".", index + 1)
+    return False
+
+
+def scan_message(content: str, dot_taxon: bool = False) -> List[ScanMatch]:
+    """Scan message content for all links & triggers.
+
+    Links are found in one pass, and `.taxon.` lookups in another only if
+    asked for. Most messages have neither and are rejected without running
+    either pattern.
+
+    Parameters
+    ----------
+    content: str
+        The message content.
+    dot_taxon: bool, optional
+        Whether to include `.taxon.` lookups.
+
+    Returns
+    -------
+    list
+        A ScanMatch for each link or trigger, in the order found.
+    """
+    matches = []
+    lowered = content.lower()
+    if any(literal in lowered for literal in LINK_LITERALS):
+        for mat in PAT_MESSAGE.finditer(content):
+            if mat["obs_id"] or mat["cmd_obs_id"]:
+                kind = "obs"
+            elif mat["taxon_id"]:
+                kind = "taxon"
+            else:
+                kind = "user"
+            matches.append(ScanMatch(kind, mat))
+    if dot_taxon and maybe_dot_taxon(content):
+        dot_taxon_matches = [
+            ScanMatch("dot_taxon", mat) for mat in PAT_DOT_TAXON.finditer(content)
+        ]
+        if dot_taxon_matches:
+            matches = sorted(
+                matches + dot_taxon_matches, key=lambda scanned: scanned.match.start()
+            )
+    return matches
+
+
+def first_match(matches: List[ScanMatch], kind: str) -> Optional[Match]:
+    """Get the first match of a kind, if any."""
+    return next((scanned.match for scanned in matches if scanned.kind == kind), None)
@@ -6,6 +6,9 @@ from .projects import Project
 from .taxa import format_taxon_name, get_taxon_fields
 from .users import User
 
+# Most results the API pages through for one query.
+MAX_SEARCH_RESULTS = 10000
+
 
 def get_place(result):
     """Get place result."""
@@ -69,7 +72,10 @@ class INatSiteSearch:
         self.cog = cog
 
     async def search(self, query, **kwargs):
-        """Search iNat site."""
+        """Search iNat site.
+
+        Pass `page` to get a later page of results.
+        """
 
         # Through experimentation on May 25, 2020, I've determined a smaller
         # number than 500 will usually be returned:
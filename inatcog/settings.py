@@ -0,0 +1,91 @@
+"""Module for in-memory snapshot of settings used by listeners."""
+import re
+from typing import NamedTuple, Optional, Pattern
+
+
+class GuildSettings(NamedTuple):
+    """Guild settings used by listeners."""
+
+    autoobs: bool = False
+    dot_taxon: bool = False
+    bot_prefixes: tuple = ()
+    bot_prefixes_pat: Optional[Pattern] = None
+
+
+class ChannelSettings(NamedTuple):
+    """Channel settings used by listeners; None inherits from the guild."""
+
+    autoobs: Optional[bool] = None
+    dot_taxon: Optional[bool] = None
+
+
+def compile_bot_prefixes(bot_prefixes) -> Optional[Pattern]:
+    """Compile pattern to match messages starting with any of the prefixes."""
+    if not bot_prefixes:
+        return None
+    prefixes = r"|".join(re.escape(bot_prefix) for bot_prefix in bot_prefixes)
+    return re.compile(r"^({prefixes})".format(prefixes=prefixes))
+
+
+class SettingsSnapshot:
+    """Snapshot of guild & channel settings, so listeners needn't await Config.
+
+    Loaded once when the cog is initialized; commands changing these
+    settings write through to it after updating Config.
+    """
+
+    def __init__(self):
+        self.guilds = {}
+        self.channels = {}
+
+    async def load(self, config):
+        """Load settings for all guilds & channels from Config."""
+        for (guild_id, values) in (await config.all_guilds()).items():
+            self.update_guild(
+                guild_id,
+                autoobs=values["autoobs"],
+                dot_taxon=values["dot_taxon"],
+                bot_prefixes=values["bot_prefixes"],
+            )
+        for (channel_id, values) in (await config.all_channels()).items():
+            self.update_channel(
+                channel_id, autoobs=values["autoobs"], dot_taxon=values["dot_taxon"]
+            )
+
+    def update_guild(self, guild_id: int, **values):
+        """Update guild settings after they are changed in Config."""
+        if "bot_prefixes" in values:
+            values["bot_prefixes"] = tuple(values["bot_prefixes"])
+            values["bot_prefixes_pat"] = compile_bot_prefixes(values["bot_prefixes"])
+        self.guilds[guild_id] = self.guild(guild_id)._replace(**values)
+
+    def update_channel(self, channel_id: int, **values):
+        """Update channel settings after they are changed in Config."""
+        self.channels[channel_id] = self.channel(channel_id)._replace(**values)
+
+    def guild(self, guild_id: int) -> GuildSettings:
+        """Get settings for guild."""
+        return self.guilds.get(guild_id) or GuildSettings()
+
+    def channel(self, channel_id: int) -> ChannelSettings:
+        """Get settings for channel."""
+        return self.channels.get(channel_id) or ChannelSettings()
+
+    def is_bot_command(self, message) -> bool:
+        """Return True if message starts with another bot's prefix."""
+        pat = self.guild(message.guild.id).bot_prefixes_pat
+        return bool(pat and pat.match(message.content))
+
+    def autoobs(self, channel) -> bool:
+        """Return True if autoobs is on in channel, inheriting from guild."""
+        channel_autoobs = self.channel(channel.id).autoobs
+        if channel_autoobs is None:
+            return self.guild(channel.guild.id).autoobs
+        return channel_autoobs
+
+    def dot_taxon(self, channel) -> bool:
+        """Return True if dot_taxon is on in channel, inheriting from guild."""
+        channel_dot_taxon = self.channel(channel.id).dot_taxon
+        if channel_dot_taxon is None:
+            return self.guild(channel.guild.id).dot_taxon
+        return channel_dot_taxon
@@ -0,0 +1,128 @@
+"""Module to fetch observation sounds."""
+import asyncio
+import contextlib
+from hashlib import sha256
+import os
+from pathlib import Path
+import tempfile
+from typing import Optional, Tuple
+
+import aiohttp
+from redbot.core.data_manager import cog_data_path
+
+from .common import LOG
+
+SOUNDS_DIR = "sounds"
+# Discord's upload limit for servers without boosts.
+MAX_SOUND_BYTES = 8 * 1024 * 1024
+# Most recently sent sounds kept on disk.
+MAX_CACHED_SOUNDS = 50
+SOUND_CHUNK_BYTES = 64 * 1024
+
+
+class INatSoundCache:
+    """Download observation sounds to an LRU cache on disk.
+
+    Downloads are streamed to a file and abandoned as soon as they are
+    known to exceed the upload limit, so large sounds never sit in memory.
+    Each cached file is named by a hash of its url followed by the name
+    to send it as; its modification time is its last use. Requests for a
+    sound already being downloaded wait for that download.
+    """
+
+    def __init__(self, cog, max_sounds=MAX_CACHED_SOUNDS, max_bytes=MAX_SOUND_BYTES):
+        self.cog = cog
+        self.max_sounds = max_sounds
+        self.max_bytes = max_bytes
+        self._path = None
+        self._downloads = {}
+
+    @property
+    def path(self) -> Path:
+        """Directory where sounds are cached."""
+        if not self._path:
+            self._path = cog_data_path(self.cog) / SOUNDS_DIR
+            self._path.mkdir(exist_ok=True)
+        return self._path
+
+    def _cached(self, key: str) -> Optional[Path]:
+        for path in self.path.glob(f"{key}-*"):
+            if path.suffix != ".tmp":
+                return path
+        return None
+
+    def _evict(self):
+        paths = sorted(
+            (path for path in self.path.iterdir() if path.suffix != ".tmp"),
+            key=lambda path: path.stat().st_mtime,
+        )
+        for path in paths[: -self.max_sounds]:
+            path.unlink()
+
+    async def _download(self, url: str, key: str) -> Optional[Path]:
+        loop = asyncio.get_running_loop()
+        # Unique, so a download abandoned part way can't clobber another:
+        (temp_fd, temp_name) = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        temp_path = Path(temp_name)
+        try:
+            with open(temp_fd, "wb") as sound_file:
+                async with self.cog.api.session.get(url) as response:
+                    if response.status != 200:
+                        LOG.info(
+                            "Sound not retrieved (HTTP %d): %s", response.status, url
+                        )
+                        return None
+                    if (
+                        response.content_length
+                        and response.content_length > self.max_bytes
+                    ):
+                        LOG.info("Sound too large to send: %s", url)
+                        return None
+                    filename = response.url.name.replace(".m4a", ".mp3")
+                    size = 0
+                    async for chunk in response.content.iter_chunked(SOUND_CHUNK_BYTES):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            LOG.info("Sound too large to send: %s", url)
+                            return None
+                        await loop.run_in_executor(None, sound_file.write, chunk)
+            path = self.path / f"{key}-{filename}"
+            temp_path.replace(path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                temp_path.unlink()
+        self.cog.metrics.incr("sound_cache.bytes", size)
+        return path
+
+    async def get_sound(self, url: str) -> Optional[Tuple[Path, str]]:
+        """Get cached file for sound url and the name to send it as.
+
+        Returns
+        -------
+        tuple
+            The path and filename, or None if the sound couldn't be
+            retrieved or is too large to send.
+        """
+        key = sha256(url.encode()).hexdigest()
+        path = self._cached(key)
+        if path:
+            self.cog.metrics.incr("sound_cache.hit")
+            os.utime(path)
+        else:
+            self.cog.metrics.incr("sound_cache.miss")
+            download = self._downloads.get(key)
+            if download is None:
+                download = asyncio.ensure_future(self._download(url, key))
+                download.add_done_callback(lambda _task: self._downloads.pop(key))
+                self._downloads[key] = download
+            else:
+                self.cog.metrics.incr("sound_cache.joined")
+            try:
+                path = await asyncio.shield(download)
+            except (aiohttp.ClientError, OSError) as err:
+                LOG.error("Sound not retrieved: %s: %s", url, err)
+                path = None
+            if not path:
+                return None
+            self._evict()
+        return (path, path.name.split("-", 1)[1])
@@ -357,14 +357,26 @@ def score_match(query, record, all_terms, exact=None):
     return score
 
 
-def match_taxon(query, records):
-    """Match a single taxon for the given query among records returned by API."""
+def get_match_patterns(query):
+    """Get patterns for scoring matches for the query.
+
+    Returns
+    -------
+    tuple
+        The all_terms pattern and list of exact patterns for score_match.
+    """
     exact = []
     all_terms = re.compile(r"^%s$" % re.escape(" ".join(query.terms)), re.I)
     if query.phrases:
         for phrase in query.phrases:
             pat = re.compile(r"\b%s\b" % re.escape(" ".join(phrase)), re.I)
             exact.append(pat)
+    return (all_terms, exact)
+
+
+def match_taxon(query, records):
+    """Match a single taxon for the given query among records returned by API."""
+    (all_terms, exact) = get_match_patterns(query)
     scores = [0] * len(records)
 
     for num, record in enumerate(records, start=0):
@@ -405,11 +417,61 @@ class INatTaxaQuery:
             return ancestor
         return None
 
+    async def maybe_match_bird_code(self, query, ancestor_id=None):
+        """Get taxon for a known 4-letter bird code, if any."""
+        taxon_id = self.cog.bird_code_table.get_taxon_id(query.code)
+        if not taxon_id:
+            return None
+        records = (await self.cog.api.get_taxa(taxon_id))["results"]
+        if not records:
+            return None
+        # Show the code as the matched term, as the API would have:
+        taxon = get_taxon_fields(records[0])._replace(term=query.code)
+        if query.ranks and taxon.rank not in query.ranks:
+            return None
+        if ancestor_id and ancestor_id not in taxon.ancestor_ids:
+            return None
+        return taxon
+
+    async def refresh_indexed_taxon(self, taxon):
+        """Fetch the record of a taxon matched in the index again.
+
+        Returns
+        -------
+        Taxon
+            The taxon, with the same matched term, or None if it is gone.
+        """
+        index = self.cog.taxon_name_index
+        records = (await self.cog.api.get_taxa(taxon.taxon_id))["results"]
+        if not records:
+            index.remove(taxon.taxon_id)
+            return None
+        fresh = get_taxon_fields(records[0])
+        index.refresh(fresh)
+        return fresh._replace(term=taxon.term)
+
     async def maybe_match_taxon(self, query, ancestor_id=None):
         """Get taxon and return a match, if any."""
+        if query.code:
+            taxon = await self.maybe_match_bird_code(query, ancestor_id)
+            if taxon:
+                return taxon
+
         if query.taxon_id:
             records = (await self.cog.api.get_taxa(query.taxon_id))["results"]
         else:
+            metrics = self.cog.metrics
+            index = self.cog.taxon_name_index
+            with metrics.timer("taxon_index.match"):
+                taxon = index.match(query, ancestor_id)
+            if taxon and index.is_stale(taxon.taxon_id):
+                metrics.incr("taxon_index.stale")
+                taxon = await self.refresh_indexed_taxon(taxon)
+            if taxon:
+                metrics.incr("taxon_index.hit")
+                return taxon
+            metrics.incr("taxon_index.miss")
+
             kwargs = {}
             kwargs["q"] = " ".join(query.terms)
             if query.ranks:
@@ -421,11 +483,21 @@ class INatTaxaQuery:
         if not records:
             raise LookupError("Nothing found")
 
-        taxon = match_taxon(query, list(map(get_taxon_fields, records)))
+        taxa = list(map(get_taxon_fields, records))
+        taxon = match_taxon(query, taxa)
+
+        if not query.taxon_id:
+            for record in taxa:
+                self.cog.taxon_name_index.add(record)
+            if taxon:
+                self.cog.taxon_name_index.confirm(query, taxon, ancestor_id)
 
         if not taxon:
             raise LookupError("No exact match")
 
+        if query.code and taxon.term == query.code:
+            await self.cog.bird_code_table.learn(query.code, taxon.taxon_id)
+
         return taxon
 
     async def maybe_match_taxon_compound(self, compound_query):
@@ -1,6 +1,7 @@
 """Test inatcog.api."""
+import asyncio
 import unittest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 from inatcog import api
 
@@ -80,3 +81,52 @@ class TestAPI(unittest.TestCase):
             self.assertEqual(
                 api.get_users("Ben Armstrong")["results"][1]["login"], "bensomebodyelse"
             )
+
+    def test_get_users_by_ids(self):
+        """Test get_users_by_ids batches lookups & falls back to single ones."""
+
+        async def get_users(user_id, refresh_cache=False):
+            return {"results": [{"id": user_id, "login": f"user{user_id}"}]}
+
+        async def run():
+            inat_api = api.INatAPI()
+            inat_api.users_cache[1] = {"results": [{"id": 1, "login": "user1"}]}
+            inat_api.get_observations = AsyncMock(
+                return_value={"results": [{"user": {"id": 2, "login": "user2"}}]}
+            )
+            with patch.object(inat_api, "get_users", get_users), patch(
+                "inatcog.api.REQUEST_INTERVAL", 0
+            ):
+                records = [
+                    record async for record in inat_api.get_users_by_ids([1, 2, 3])
+                ]
+            await inat_api.session.close()
+            inat_api.get_observations.assert_awaited_once_with(
+                "observers", user_id="2,3", per_page=2
+            )
+            return [record["id"] for record in records]
+
+        self.assertEqual(asyncio.run(run()), [1, 2, 3])
+
+    def test_fan_out(self):
+        """Test fanned out requests are capped & each waits for its turn."""
+        sending = []
+        most_sending = []
+
+        async def run():
+            inat_api = api.INatAPI()
+            inat_api._throttle = AsyncMock()
+
+            async def request():
+                async with inat_api.fan_out():
+                    sending.append(1)
+                    most_sending.append(len(sending))
+                    await asyncio.sleep(0)
+                    sending.pop()
+
+            await asyncio.gather(*(request() for _i in range(10)))
+            await inat_api.session.close()
+            return inat_api._throttle.await_count
+
+        self.assertEqual(asyncio.run(run()), 10)
+        self.assertEqual(max(most_sending), api.MAX_CONCURRENT_REQUESTS)
@@ -0,0 +1,108 @@
+"""Test inatcog.autocomplete."""
+import unittest
+
+from inatcog.autocomplete import TaxonNameIndex
+from inatcog.parsers import SimpleQuery
+from inatcog.taxa import Taxon
+
+
+def make_taxon(taxon_id, name, common, term, rank="species", ancestor_ids=None):
+    """Make a taxon as if from an autocomplete result."""
+    return Taxon(
+        name,
+        taxon_id,
+        common,
+        term,
+        None,
+        None,
+        None,
+        rank,
+        ancestor_ids or [48460, 1, 3],
+        100,
+        [],
+        True,
+    )
+
+
+def make_query(terms, phrases=None, ranks=None, code=None):
+    """Make a simple query."""
+    return SimpleQuery(
+        taxon_id=None, terms=terms, phrases=phrases or [], ranks=ranks or [], code=code
+    )
+
+
+WTSP = make_taxon(9184, "Zonotrichia albicollis", "White-throated Sparrow", "WTSP")
+WCSP = make_taxon(
+    9161, "Zonotrichia leucophrys", "White-crowned Sparrow", "White-crowned Sparrow"
+)
+
+
+class TestTaxonNameIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TaxonNameIndex(max_taxa=2)
+        self.index.add(WTSP)
+        self.index.add(WCSP)
+
+    def test_prefix_candidates(self):
+        """Test all query words prefix-match words of names."""
+        query = make_query(["white", "spar"])
+        self.assertEqual({9184, 9161}, self.index.candidates(query))
+        query = make_query(["zono", "alb"])
+        self.assertEqual({9184}, self.index.candidates(query))
+
+    def test_code_match(self):
+        """Test a code match is confident."""
+        self.index.confirm(make_query(["zonotrichia", "albicollis"]), WTSP)
+        taxon = self.index.match(make_query(["wtsp"], code="WTSP"))
+        self.assertEqual(9184, taxon.taxon_id)
+        self.assertEqual("WTSP", taxon.term)
+
+    def test_phrase_match(self):
+        """Test a single exact phrase match is confident."""
+        query = make_query(
+            ["zonotrichia", "leucophrys"], phrases=[["zonotrichia", "leucophrys"]]
+        )
+        self.index.confirm(make_query(["white", "crowned"]), WCSP)
+        self.assertEqual(9161, self.index.match(query).taxon_id)
+
+    def test_unconfirmed_falls_through(self):
+        """Test an exact match needs the API if it never matched the taxon."""
+        self.assertIsNone(self.index.match(make_query(["wtsp"], code="WTSP")))
+
+    def test_non_exact_falls_through(self):
+        """Test a non-exact match needs the API."""
+        self.assertIsNone(self.index.match(make_query(["white"])))
+
+    def test_confirmed_match(self):
+        """Test a query previously matched by the API is confident."""
+        query = make_query(["white"])
+        self.index.confirm(query, WCSP)
+        self.assertEqual(9161, self.index.match(query).taxon_id)
+
+    def test_rank_and_ancestor_filters(self):
+        """Test candidates are filtered by rank & ancestor."""
+        self.index.confirm(make_query(["zonotrichia", "albicollis"]), WTSP)
+        query = make_query(["wtsp"], ranks=["genus"], code="WTSP")
+        self.assertIsNone(self.index.match(query))
+        query = make_query(["wtsp"], code="WTSP")
+        self.assertIsNone(self.index.match(query, ancestor_id=47126))
+        self.assertIsNotNone(self.index.match(query, ancestor_id=3))
+
+    def test_eviction(self):
+        """Test least recently used taxa are evicted from the index."""
+        self.index.add(make_taxon(1, "Animalia", "Animals", "Animals", "kingdom"))
+        self.assertEqual(2, len(self.index))
+        self.assertEqual(set(), self.index.candidates(make_query(["zono", "alb"])))
+        self.assertEqual(set(), self.index.prefix_ids("albicollis"))
+        self.assertNotIn("l", self.index.trie.children["a"].children)
+
+    def test_stale(self):
+        """Test records are stale after the ttl until refreshed."""
+        self.assertFalse(self.index.is_stale(9184))
+        self.index.ttl = 0
+        self.assertTrue(self.index.is_stale(9184))
+        self.index.refresh(WTSP._replace(observations=200, term="Id: 9184"))
+        self.index.ttl = 60
+        self.assertFalse(self.index.is_stale(9184))
+        self.assertEqual(200, self.index.taxa[9184].observations)
+        self.assertEqual("WTSP", self.index.taxa[9184].term)
@@ -0,0 +1,97 @@
+"""Test inatcog.bird_codes."""
+import asyncio
+from pathlib import Path
+import re
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import inatcog
+from inatcog.autocomplete import TaxonNameIndex
+from inatcog.bird_codes import INatBirdCodeTable
+from inatcog.metrics import Metrics
+from inatcog.parsers import SimpleQuery
+from inatcog.taxa import INatTaxaQuery
+
+DATA_PATH = Path(inatcog.__file__).parent / "data"
+WTSP = {
+    "id": 9184,
+    "name": "Zonotrichia albicollis",
+    "preferred_common_name": "White-throated Sparrow",
+    "matched_term": "WTSP",
+    "rank": "species",
+    "ancestor_ids": [48460, 1, 3, 9184],
+    "observations_count": 100,
+    "is_active": True,
+}
+
+
+def make_query(code, ranks=None):
+    """Make a query for a bird code."""
+    return SimpleQuery(
+        taxon_id=None, terms=[code.lower()], phrases=[], ranks=ranks or [], code=code
+    )
+
+
+def make_cog(bird_codes=None):
+    """Make a cog with a bird code table & config holding the codes."""
+    cog = MagicMock()
+    cog.config.bird_codes = AsyncMock(return_value=bird_codes or {})
+    cog.config.bird_codes.set_raw = AsyncMock()
+    cog.metrics = Metrics()
+    cog.taxon_name_index = TaxonNameIndex()
+    cog.api.get_taxa = AsyncMock(return_value={"results": [WTSP]})
+    cog.bird_code_table = INatBirdCodeTable(cog)
+    return cog
+
+
+class TestINatBirdCodeTable(unittest.TestCase):
+    def test_load_bundled(self):
+        """Test bundled codes are 4 letters, each for a binomial name."""
+        cog = make_cog({"WTSP": 9184})
+        with patch("inatcog.bird_codes.bundled_data_path", return_value=DATA_PATH):
+            asyncio.run(cog.bird_code_table.load())
+        names = cog.bird_code_table.names
+        self.assertEqual("Zonotrichia albicollis", names["WTSP"])
+        for (code, name) in names.items():
+            self.assertRegex(code, r"^[A-Z]{4}$")
+            self.assertTrue(re.match(r"^[A-Z][a-z]+ [a-z-]+$", name), name)
+        self.assertEqual(len(names), len(set(names.values())))
+        self.assertEqual(9184, cog.bird_code_table.get_taxon_id("wtsp"))
+        self.assertIsNone(cog.bird_code_table.get_taxon_id("WCSP"))
+
+    def test_learn(self):
+        """Test a code matched by the API is learned & stored once."""
+        cog = make_cog()
+        taxa_query = INatTaxaQuery(cog)
+
+        async def run():
+            await cog.bird_code_table.load()
+            taxon = await taxa_query.maybe_match_taxon(make_query("WTSP"))
+            self.assertEqual(9184, taxon.taxon_id)
+            await cog.bird_code_table.learn("wtsp", 9184)
+
+        with patch("inatcog.bird_codes.bundled_data_path", return_value=DATA_PATH):
+            asyncio.run(run())
+        self.assertEqual(9184, cog.bird_code_table.get_taxon_id("WTSP"))
+        cog.config.bird_codes.set_raw.assert_awaited_once_with("WTSP", value=9184)
+
+    def test_maybe_match_bird_code(self):
+        """Test a known code is matched by id, filtered by rank & ancestor."""
+        cog = make_cog()
+        cog.bird_code_table.taxon_ids = {"WTSP": 9184}
+        taxa_query = INatTaxaQuery(cog)
+
+        async def run():
+            taxon = await taxa_query.maybe_match_bird_code(make_query("WTSP"))
+            self.assertEqual(9184, taxon.taxon_id)
+            self.assertEqual("WTSP", taxon.term)
+            cog.api.get_taxa.assert_awaited_once_with(9184)
+            query = make_query("WTSP", ranks=["genus"])
+            self.assertIsNone(await taxa_query.maybe_match_bird_code(query))
+            query = make_query("WTSP")
+            self.assertIsNone(await taxa_query.maybe_match_bird_code(query, 47126))
+            self.assertIsNotNone(await taxa_query.maybe_match_bird_code(query, 3))
+            query = make_query("XXXX")
+            self.assertIsNone(await taxa_query.maybe_match_bird_code(query))
+
+        asyncio.run(run())
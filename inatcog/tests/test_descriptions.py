@@ -0,0 +1,46 @@
+"""Test inatcog.descriptions."""
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from inatcog.descriptions import (
+    render_description,
+    RenderedDescriptions,
+    truncate_html,
+)
+
+
+class TestDescriptions(unittest.TestCase):
+    def test_truncate_html(self):
+        """Test HTML is cut before an incomplete tag or entity."""
+        self.assertEqual("short", truncate_html("short", 10))
+        self.assertEqual("<p>one …", truncate_html("<p>one <a href='x'>two</a>", 10))
+        self.assertEqual("fish …", truncate_html("fish &amp; chips", 7))
+
+    def test_truncate_bare_lt(self):
+        """Test a "<" not starting a tag is kept as text."""
+        self.assertEqual("size <5cm, gr…", truncate_html("size <5cm, green", 13))
+        self.assertEqual("a <b> c …", truncate_html("a <b> c </b>", 8))
+
+    def test_render_description(self):
+        """Test long descriptions are bounded."""
+        description = render_description("<p>line</p>" * 50)
+        self.assertEqual(11, description.count("\n> "))
+        self.assertTrue(description.endswith("\n> …"))
+        description = render_description("<p>%s</p>" % ("word " * 1000))
+        self.assertLessEqual(len(description), 500)
+
+    def test_rendered_descriptions(self):
+        """Test descriptions are rendered again only when changed."""
+        descriptions = RenderedDescriptions(maxlen=1)
+        obs = MagicMock(obs_id=1, description="<p>one</p>")
+
+        async def run():
+            first = await descriptions.format_description(obs)
+            self.assertIs(first, await descriptions.format_description(obs))
+            obs.description = "<p>two</p>"
+            self.assertIn("two", await descriptions.format_description(obs))
+            await descriptions.format_description(MagicMock(obs_id=2, description="x"))
+
+        asyncio.run(run())
+        self.assertEqual([2], list(descriptions.rendered))
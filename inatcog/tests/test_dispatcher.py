@@ -0,0 +1,91 @@
+"""Test inatcog.dispatcher."""
+import asyncio
+import unittest
+
+from inatcog.dispatcher import WorkDispatcher
+from inatcog.metrics import Metrics
+
+
+class TestWorkDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.done = []
+
+    def job(self, name):
+        """Make a job recording its name when run."""
+
+        async def run():
+            self.done.append(name)
+
+        return run
+
+    def run_jobs(self, submit, workers=1, max_queue=3):
+        """Submit jobs, then run them to completion."""
+
+        async def run():
+            dispatcher = WorkDispatcher(self.metrics, workers, max_queue)
+            dispatcher.start()
+            submit(dispatcher)
+            while dispatcher.depth:
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            dispatcher.stop()
+
+        asyncio.run(run())
+
+    def test_guilds_take_turns(self):
+        """Test a busy guild doesn't hold up another."""
+
+        def submit(dispatcher):
+            for name in ("a1", "a2", "a3"):
+                dispatcher.submit(1, self.job(name))
+            dispatcher.submit(2, self.job("b1"))
+
+        self.run_jobs(submit)
+        self.assertEqual(["a1", "b1", "a2", "a3"], self.done)
+
+    def test_coalesce_and_drop(self):
+        """Test keyed jobs are replaced and the oldest is dropped when full."""
+
+        def submit(dispatcher):
+            dispatcher.submit(1, self.job("add"), key="reaction")
+            dispatcher.submit(1, self.job("remove"), key="reaction")
+            for name in ("j1", "j2", "j3"):
+                dispatcher.submit(1, self.job(name))
+
+        self.run_jobs(submit)
+        self.assertEqual(["j1", "j2", "j3"], self.done)
+        self.assertEqual(1, self.metrics.counters["dispatch.coalesced"])
+        self.assertEqual(1, self.metrics.counters["dispatch.dropped"])
+        self.assertEqual((0, 3), self.metrics.gauges["dispatch.depth"])
+
+    def test_queue_until_started(self):
+        """Test jobs submitted before the workers are started run once they are."""
+        dispatcher = WorkDispatcher(self.metrics)
+        dispatcher.submit(1, self.job("early"))
+        self.assertEqual(1, dispatcher.depth)
+
+        async def run():
+            dispatcher.start()
+            dispatcher.submit(1, self.job("late"))
+            while dispatcher.depth:
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            dispatcher.stop()
+
+        asyncio.run(run())
+        self.assertEqual(["early", "late"], self.done)
+
+    def test_detach(self):
+        """Test a detached job doesn't hold up queued jobs."""
+
+        async def prompt():
+            await asyncio.sleep(15)
+            self.done.append("prompt")
+
+        def submit(dispatcher):
+            dispatcher.detach(prompt)
+            dispatcher.submit(1, self.job("j1"))
+
+        self.run_jobs(submit)
+        self.assertEqual(["j1"], self.done)
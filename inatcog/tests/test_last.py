@@ -0,0 +1,175 @@
+"""Test inatcog.last."""
+import asyncio
+from datetime import datetime
+import json
+from types import SimpleNamespace
+import unittest
+from unittest.mock import AsyncMock
+
+from inatcog.last import INatLinkMsg, RecentLinks
+from inatcog.listeners import Listeners
+from inatcog.reactions import CountsEmbeds, ReactionMessages
+
+
+def make_message(message_id, content, bot=False, embed_url=None):
+    """Make a partial message with the fields used to match links."""
+    return SimpleNamespace(
+        id=message_id,
+        content=content,
+        author=SimpleNamespace(bot=bot, name="someone", nick=None),
+        channel=SimpleNamespace(id=1),
+        embeds=[SimpleNamespace(url=embed_url)] if embed_url else [],
+        created_at=datetime.utcnow(),
+    )
+
+
+class FakeHistory:
+    """Partial history iterator."""
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def flatten(self):
+        """Get all messages."""
+        return self.messages
+
+
+class FakeChannel:
+    """Partial channel with history, newest message first."""
+
+    def __init__(self, messages):
+        self.id = 1  # pylint: disable=invalid-name
+        self.messages = messages
+        self.fetched = []
+
+    def history(self, limit, before=None):
+        """Get history before a message."""
+        start = 0
+        if before:
+            start = next(
+                index
+                for (index, message) in enumerate(self.messages)
+                if message.id == before.id
+            )
+            start += 1
+        self.fetched.append(limit)
+        return FakeHistory(self.messages[start : start + limit])
+
+
+class TestRecentLinks(unittest.TestCase):
+    def setUp(self):
+        self.recent_links = RecentLinks(maxlen=2)
+
+    def test_last_links(self):
+        """Test latest links are found by kind."""
+        self.recent_links.add_message(
+            make_message(1, "https://www.inaturalist.org/observations/123")
+        )
+        self.recent_links.add_message(make_message(2, "obs 456", bot=True))
+        self.recent_links.add_message(
+            make_message(3, "", bot=True, embed_url="https://inaturalist.org/taxa/789")
+        )
+        self.assertEqual(123, self.recent_links.last_obs(1).link_id)
+        self.assertEqual(789, self.recent_links.last_taxon(1).link_id)
+        self.assertIsNone(self.recent_links.last_obs(2))
+
+    def test_scan_keeps_order(self):
+        """Test history older than links already seen doesn't replace them."""
+        self.recent_links.add_message(make_message(10, "obs 10"))
+        history = [make_message(9, "obs 9"), make_message(8, "obs 8")]
+        channel = FakeChannel(history)
+
+        async def scan_all():
+            return [message async for message in self.recent_links.scan(channel)]
+
+        self.assertFalse(self.recent_links.is_primed(1))
+        self.assertEqual(history, asyncio.run(scan_all()))
+        self.assertTrue(self.recent_links.is_primed(1))
+        self.assertEqual([9, 10], [hit.link_id for hit in self.recent_links.obs[1]])
+
+    def test_scan_stops_early(self):
+        """Test scan fetches history only until the caller stops."""
+        history = [make_message(i, f"obs {i}") for i in range(100, 0, -1)]
+        channel = FakeChannel(history)
+
+        async def scan_first():
+            async for message in self.recent_links.scan(channel):
+                return message
+
+        self.assertEqual(100, asyncio.run(scan_first()).id)
+        self.assertEqual([10], channel.fetched)
+        self.assertFalse(self.recent_links.is_primed(1))
+        # Scanning again resumes after the last message scanned:
+        self.assertEqual(99, asyncio.run(scan_first()).id)
+        self.assertEqual([10, 10], channel.fetched)
+
+    def test_remove_message(self):
+        """Test links from deleted messages are forgotten."""
+        self.recent_links.add_message(make_message(1, "obs 1"))
+        self.recent_links.add_message(make_message(2, "obs 2"))
+        self.recent_links.remove_message(1, 2)
+        self.assertEqual(1, self.recent_links.last_obs(1).link_id)
+
+    def test_bulk_delete(self):
+        """Test links from messages deleted at once are forgotten."""
+        for message_id in (1, 2, 3):
+            self.recent_links.add_message(make_message(message_id, f"obs {message_id}"))
+        cog = SimpleNamespace(
+            recent_links=self.recent_links,
+            reaction_messages=ReactionMessages(),
+            counts_embeds=CountsEmbeds(),
+        )
+        payload = SimpleNamespace(channel_id=1, message_ids={2, 3})
+        asyncio.run(Listeners.on_raw_bulk_message_delete(cog, payload))
+        self.assertIsNone(self.recent_links.last_obs(1))
+
+    def test_last_obs_msg(self):
+        """Test the newest observation link found in messages is looked up."""
+        cog = SimpleNamespace(obs_query=SimpleNamespace(get_obs=AsyncMock()))
+
+        async def messages():
+            for message in (make_message(3, "no link"), make_message(2, "obs 2")):
+                yield message
+
+        msg = asyncio.run(INatLinkMsg(cog).get_last_obs_msg(messages()))
+        self.assertEqual("https://www.inaturalist.org/observations/2", msg.url)
+        cog.obs_query.get_obs.assert_awaited_once_with(2)
+
+    def test_dump_and_load(self):
+        """Test links survive a restart & missed messages are caught up."""
+        self.recent_links.add_message(
+            make_message(1, "https://www.inaturalist.ca/observations/1")
+        )
+        self.recent_links.add_message(make_message(2, "obs 2"))
+        dumped = json.loads(json.dumps(self.recent_links.dump()))
+        self.assertFalse(self.recent_links.dirty)
+
+        recent_links = RecentLinks(maxlen=2)
+        recent_links.load(dumped)
+        self.assertEqual([1, 2], [hit.link_id for hit in recent_links.obs[1]])
+        self.assertEqual(
+            "https://www.inaturalist.ca/observations/1", recent_links.obs[1][0].url
+        )
+
+        channel = FakeChannel([make_message(3, "obs 3"), make_message(2, "obs 2")])
+        asyncio.run(recent_links.catch_up(channel))
+        self.assertEqual(3, recent_links.last_obs(1).link_id)
+        self.assertEqual([10], channel.fetched)
+        asyncio.run(recent_links.catch_up(channel))
+        self.assertEqual([10], channel.fetched)
+
+    def test_command_links(self):
+        """Test links in messages invoking commands are remembered."""
+        ready = asyncio.Event()
+        ready.set()
+        cog = SimpleNamespace(recent_links=self.recent_links, _ready_event=ready)
+        for (message_id, content) in (
+            (1, "[p]obs 123"),
+            (2, "[p]link https://www.inaturalist.org/observations/456"),
+        ):
+            ctx = SimpleNamespace(
+                guild=SimpleNamespace(id=1), message=make_message(message_id, content)
+            )
+            asyncio.run(Listeners.on_command(cog, ctx))
+            self.assertEqual(message_id, self.recent_links.last_obs(1).message_id)
+        self.assertEqual(456, self.recent_links.last_obs(1).link_id)
@@ -0,0 +1,46 @@
+"""Test inatcog.locks."""
+import asyncio
+import unittest
+
+from inatcog.locks import KeyedLocks
+from inatcog.metrics import Metrics
+
+
+class TestKeyedLocks(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.locks = KeyedLocks(self.metrics, "locks", max_locks=1)
+
+    def test_freed_when_released(self):
+        """Test a lock is freed once released with no waiters."""
+
+        async def run():
+            async with self.locks.lock(1):
+                self.assertTrue(self.locks.locked(1))
+                self.assertFalse(self.locks.locked(2))
+            self.assertFalse(self.locks.locked(1))
+            self.assertEqual(len(self.locks), 0)
+
+        asyncio.run(run())
+
+    def test_shared_while_contended(self):
+        """Test tasks locking the same key run one at a time."""
+        order = []
+
+        async def task(name):
+            async with self.locks.lock(1):
+                order.append(name + " in")
+                await asyncio.sleep(0)
+                order.append(name + " out")
+
+        async def run():
+            await asyncio.gather(task("a"), task("b"), self.other_key())
+            self.assertEqual(len(self.locks), 0)
+
+        asyncio.run(run())
+        self.assertEqual(order, ["a in", "a out", "b in", "b out"])
+        self.assertEqual(self.metrics.counters["locks.over_cap"], 1)
+
+    async def other_key(self):
+        async with self.locks.lock(2):
+            await asyncio.sleep(0)
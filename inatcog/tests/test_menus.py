@@ -0,0 +1,55 @@
+"""Test inatcog.menus."""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from inatcog.menus import LazyPages, lazy_menu, NEXT_PAGE, PREV_PAGE
+
+
+class TestLazyPages(unittest.TestCase):
+    def setUp(self):
+        self.rendered = []
+
+    async def render(self, index):
+        self.rendered.append(index)
+        return f"page {index}"
+
+    def test_renders_on_demand(self):
+        """Test only the page fetched and the one after it are rendered."""
+
+        async def run():
+            pages = LazyPages(100, self.render)
+            self.assertEqual(len(pages), 100)
+            self.assertEqual(await pages.fetch(0), "page 0")
+            self.assertEqual(await pages.fetch(0, step=-1), "page 0")
+            await asyncio.sleep(0)
+            pages.cancel()
+
+        asyncio.run(run())
+        self.assertEqual(self.rendered, [0, 1, 99])
+
+    def test_lazy_menu(self):
+        """Test the menu shows each page as its control is used."""
+        message = MagicMock()
+        message.edit = AsyncMock()
+        message.remove_reaction = AsyncMock()
+        message.clear_reactions = AsyncMock()
+        ctx = MagicMock()
+        ctx.send = AsyncMock(return_value=message)
+        reactions = [
+            (MagicMock(emoji=emoji), ctx.author)
+            for emoji in (NEXT_PAGE, NEXT_PAGE, PREV_PAGE, PREV_PAGE, PREV_PAGE)
+        ]
+        ctx.bot.wait_for = AsyncMock(side_effect=[*reactions, asyncio.TimeoutError])
+
+        async def run():
+            with patch("inatcog.menus.start_adding_reactions"):
+                await lazy_menu(ctx, LazyPages(5, self.render))
+
+        asyncio.run(run())
+        ctx.send.assert_awaited_once_with(embed="page 0")
+        self.assertEqual(
+            [call.kwargs["embed"] for call in message.edit.await_args_list],
+            ["page 1", "page 2", "page 1", "page 0", "page 4"],
+        )
+        message.clear_reactions.assert_awaited_once()
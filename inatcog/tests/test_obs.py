@@ -0,0 +1,45 @@
+"""Test inatcog.obs."""
+import copy
+import unittest
+
+from inatcog.obs import get_obs_fields
+
+
+def make_ident(taxon_id, ancestor_ids, current=True):
+    """Make an identification record."""
+    return {
+        "current": current,
+        "taxon": {"id": taxon_id, "ancestor_ids": ancestor_ids},
+    }
+
+
+RECORD = {
+    "id": 1,
+    "community_taxon": {"id": 10},
+    "ident_taxon_ids": [1, 10, 11],
+    "identifications": [
+        make_ident(10, [1]),
+        make_ident(11, [1, 10]),
+        make_ident(12, [1, 10]),
+        make_ident(20, [1]),
+        make_ident(20, [1], current=False),
+    ],
+    "project_ids": [100],
+    "non_traditional_projects": [{"project_id": 200}],
+}
+
+
+class TestObs(unittest.TestCase):
+    def test_community_id_counts(self):
+        """Test agreeing & maverick identifications are counted."""
+        obs = get_obs_fields(RECORD)
+        self.assertEqual(3, obs.idents_count)
+        self.assertEqual(2, obs.idents_agree)
+
+    def test_record_not_modified(self):
+        """Test decoding fields leaves the JSON record as it was."""
+        record = copy.deepcopy(RECORD)
+        obs = get_obs_fields(record)
+        self.assertEqual([100, 200], obs.project_ids)
+        self.assertEqual(3, obs.idents_count)
+        self.assertEqual(RECORD, record)
@@ -0,0 +1,63 @@
+"""Test inatcog.projects."""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from inatcog.metrics import Metrics
+from inatcog.projects import INatProjectTable, UserProject
+
+OBSERVERS = {
+    "results": [
+        {"user_id": 3, "observation_count": 30, "species_count": 10},
+        {"user_id": 1, "observation_count": 20, "species_count": 15},
+    ]
+}
+
+
+def make_user_project(project_id, user_ids):
+    """Make a user project observed by users."""
+    return UserProject.from_dict(
+        {
+            "id": project_id,
+            "title": f"Project {project_id}",
+            "user_ids": [],
+            "project_observation_rules": [
+                {"operator": "observed_by_user?", "operand_id": user_id}
+                for user_id in user_ids
+            ]
+            + [{"operator": "in_taxon?", "operand_id": 1}],
+            "project_type": "collection",
+        }
+    )
+
+
+class TestINatProjectTable(unittest.TestCase):
+    def test_get_leaderboard(self):
+        """Test leaderboard ranks are cached per project & ordering."""
+        cog = MagicMock()
+        cog.metrics = Metrics()
+        cog.api.get_project_observers_stats = AsyncMock(return_value=OBSERVERS)
+        project_table = INatProjectTable(cog)
+
+        async def run():
+            leaderboard = await project_table.get_leaderboard(1)
+            await project_table.get_leaderboard(1)
+            await project_table.get_leaderboard(1, "species_count")
+            return leaderboard
+
+        leaderboard = asyncio.run(run())
+        self.assertEqual(leaderboard.get_rank(1), 2)
+        self.assertIsNone(leaderboard.get_rank(2))
+        self.assertEqual(cog.api.get_project_observers_stats.await_count, 2)
+        self.assertEqual(cog.metrics.counters["leaderboard_cache.hit"], 1)
+
+    def test_index_user_projects(self):
+        """Test projects are indexed by user & refreshed when fetched again."""
+        project_table = INatProjectTable(MagicMock())
+        project_table.index_user_projects(
+            [make_user_project(10, [1, 2]), make_user_project(20, [2])]
+        )
+        self.assertEqual(project_table.get_user_project_ids(2), {10, 20})
+        project_table.index_user_projects([make_user_project(10, [2])])
+        self.assertEqual(project_table.get_user_project_ids(1), set())
+        self.assertEqual(project_table.get_user_project_ids(2), {10, 20})
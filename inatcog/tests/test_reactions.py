@@ -0,0 +1,182 @@
+"""Test inatcog.reactions."""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from discord import Embed
+
+from inatcog.locks import KeyedLocks
+from inatcog.metrics import Metrics
+from inatcog.reactions import CountsEmbed, INatCountsEditor, ReactionMessages
+
+
+def make_message(message_id):
+    """Make a message with an id."""
+    message = MagicMock()
+    message.id = message_id
+    return message
+
+
+class TestReactionMessages(unittest.TestCase):
+    def test_lru(self):
+        """Test least recently used messages are evicted."""
+        messages = ReactionMessages(maxlen=2)
+        messages.add(make_message(1))
+        messages.add(make_message(2))
+        self.assertEqual(1, messages.get(1).id)
+        messages.add(make_message(3))
+        self.assertIsNone(messages.get(2))
+        self.assertEqual(2, len(messages))
+        messages.remove(1)
+        self.assertIsNone(messages.get(1))
+
+
+class TestCountsEmbed(unittest.TestCase):
+    def test_parse_render(self):
+        """Test counts parsed from an embed render the same description."""
+        description = (
+            "is a species with [5](url) observations in: Life.\n"
+            "__obs# (spp#) by user:__\n"
+            "[3](https://www.inaturalist.org/observations?taxon_id=9184&user_id=1"
+            "&verifiable=any) bob \n"
+            "[2](https://www.inaturalist.org/observations?taxon_id=9184&user_id=2"
+            "&verifiable=any) bobby \n"
+            "[5](https://www.inaturalist.org/observations?taxon_id=9184"
+            "&user_id=bob,bobby&verifiable=any) *total* "
+        )
+        embed = Embed(
+            url="https://www.inaturalist.org/taxa/9184", description=description
+        )
+        counts = CountsEmbed.from_embed(embed)
+        self.assertEqual(9184, counts.taxon_id)
+        self.assertEqual(["bob", "bobby"], list(counts.users))
+        self.assertFalse(counts.places)
+        self.assertEqual(description, counts.render())
+        del counts.users["bob"]
+        counts.user_total = None
+        self.assertEqual(
+            "is a species with [5](url) observations in: Life.\n"
+            "__obs# (spp#) by user:__\n"
+            "[2](https://www.inaturalist.org/observations?taxon_id=9184&user_id=2"
+            "&verifiable=any) bobby ",
+            counts.render(),
+        )
+
+    def test_place_counts(self):
+        """Test place counts are keyed by place id, with filters from the url."""
+        embed = Embed(
+            url="https://www.inaturalist.org/observations?taxon_id=9184&user_id=1",
+            description=(
+                "\n__obs# (spp#) from place:__\n"
+                "[3](https://www.inaturalist.org/observations?taxon_id=9184"
+                "&place_id=6712&verifiable=true&user_id=1) Ontario "
+            ),
+        )
+        counts = CountsEmbed.from_embed(embed)
+        self.assertEqual("1", counts.user_id)
+        self.assertEqual([6712], list(counts.places))
+        self.assertEqual(embed.description, counts.render())
+
+    def test_not_taxon(self):
+        """Test embeds not for a taxon have no counts."""
+        embed = Embed(url="https://www.inaturalist.org/observations/1")
+        self.assertIsNone(CountsEmbed.from_embed(embed))
+
+
+class TestINatCountsEditor(unittest.TestCase):
+    def test_batched_edit(self):
+        """Test changes within the debounce window are applied in one edit."""
+        cog = MagicMock()
+        cog.reaction_locks = KeyedLocks(Metrics(), "reaction_locks")
+        editor = INatCountsEditor(cog, delay=0)
+        msg = make_message(1)
+        msg.embeds = [Embed()]
+        msg.edit = AsyncMock()
+        counts = CountsEmbed(9184)
+        users = [MagicMock(login=login) for login in ("a", "b", "c")]
+
+        async def format_counts(_cog, user, _taxon, _place_id):
+            login = user if isinstance(user, str) else user.login
+            return f"[1](url) {login}"
+
+        async def react():
+            with patch("inatcog.reactions.get_taxon", AsyncMock()), patch(
+                "inatcog.reactions.format_user_taxon_counts", format_counts
+            ):
+                for user in users:
+                    editor.change(msg, counts, "users", user, "toggle")
+                # Undone before the edit:
+                editor.change(msg, counts, "users", users[2], "remove")
+                await editor.tasks[1]
+
+        asyncio.run(react())
+        msg.edit.assert_called_once()
+        self.assertEqual(["a", "b"], list(counts.users))
+        self.assertEqual("[1](url) a,b", counts.user_total)
+        self.assertEqual({}, editor.tasks)
+
+    def test_change_while_applying(self):
+        """Test a change made while others are applied is applied after them."""
+        cog = MagicMock()
+        cog.reaction_locks = KeyedLocks(Metrics(), "reaction_locks")
+        editor = INatCountsEditor(cog, delay=0)
+        msg = make_message(1)
+        msg.embeds = [Embed()]
+        msg.edit = AsyncMock()
+        counts = CountsEmbed(9184)
+        user = MagicMock(login="a")
+
+        async def react():
+            formatting = asyncio.Event()
+            formatted = asyncio.Event()
+
+            async def format_counts(_cog, _user, _taxon, _place_id):
+                formatting.set()
+                await formatted.wait()
+                return "[1](url) a"
+
+            with patch("inatcog.reactions.get_taxon", AsyncMock()), patch(
+                "inatcog.reactions.format_user_taxon_counts", format_counts
+            ):
+                editor.change(msg, counts, "users", user, "add")
+                applied = editor.tasks[1]
+                await formatting.wait()
+                self.assertTrue(editor.has_entries(1, counts, "users"))
+                editor.change(msg, counts, "users", user, "toggle")
+                self.assertFalse(editor.has_entries(1, counts, "users"))
+                formatted.set()
+                await asyncio.gather(applied, editor.tasks[1])
+
+        asyncio.run(react())
+        self.assertEqual(2, msg.edit.await_count)
+        self.assertEqual([], list(counts.users))
+        self.assertEqual({}, editor.applying)
+
+    def test_failed_apply(self):
+        """Test counts are left as sent if any can't be fetched."""
+        cog = MagicMock()
+        cog.reaction_locks = KeyedLocks(Metrics(), "reaction_locks")
+        editor = INatCountsEditor(cog, delay=0)
+        msg = make_message(1)
+        msg.embeds = [Embed()]
+        msg.edit = AsyncMock()
+        counts = CountsEmbed(9184)
+        counts.users["a"] = "[1](url) a"
+        users = [MagicMock(login=login) for login in ("a", "b")]
+
+        async def format_counts(_cog, _user, _taxon, _place_id):
+            raise ValueError
+
+        async def react():
+            with patch("inatcog.reactions.get_taxon", AsyncMock()), patch(
+                "inatcog.reactions.format_user_taxon_counts", format_counts
+            ), patch("inatcog.reactions.LOG") as log:
+                editor.change(msg, counts, "users", users[0], "remove")
+                editor.change(msg, counts, "users", users[1], "add")
+                await editor.tasks[1]
+                log.exception.assert_called_once()
+
+        asyncio.run(react())
+        msg.edit.assert_not_called()
+        self.assertEqual(["a"], list(counts.users))
+        self.assertEqual({}, editor.applying)
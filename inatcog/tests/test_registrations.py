@@ -0,0 +1,30 @@
+"""Test inatcog.registrations."""
+import unittest
+
+from inatcog.registrations import UserRegistrations
+
+
+class TestUserRegistrations(unittest.TestCase):
+    def setUp(self):
+        self.registrations = UserRegistrations()
+        self.registrations.update_user(1, inat_user_id=100, known_in=[10])
+        self.registrations.update_user(2, inat_user_id=200, known_in=[20])
+
+    def test_lookups(self):
+        """Test lookups by guild, Discord id & iNat id."""
+        registrations = self.registrations
+        self.assertEqual(registrations.inat_user_id(10, 1), 100)
+        self.assertIsNone(registrations.inat_user_id(10, 2))
+        self.assertEqual(registrations.guild_users(20), {2: 200})
+        self.assertEqual(registrations.discord_users(100), {1})
+        self.assertTrue(registrations.user(1).is_known_in(10))
+
+    def test_update_user(self):
+        """Test known_all & removal are reflected in the indexes."""
+        registrations = self.registrations
+        registrations.update_user(2, known_all=True)
+        self.assertEqual(registrations.guild_users(10), {1: 100, 2: 200})
+        registrations.update_user(1, inat_user_id=None, known_in=(), known_all=False)
+        self.assertEqual(registrations.guild_users(10), {2: 200})
+        self.assertEqual(registrations.discord_users(100), set())
+        self.assertNotIn(10, registrations.guilds)
@@ -0,0 +1,45 @@
+"""Test inatcog.scanner."""
+import unittest
+
+from inatcog.scanner import first_match, scan_message
+
+
+class TestScanMessage(unittest.TestCase):
+    def test_kinds(self):
+        """Test every kind of link & trigger is matched in order."""
+        matches = scan_message(
+            "https://www.inaturalist.org/observations/1 obs 2 .rwbl. "
+            "https://inaturalist.ca/taxa/3-Genus https://naturalista.mx/people/bee",
+            dot_taxon=True,
+        )
+        self.assertEqual(
+            ["obs", "obs", "dot_taxon", "taxon", "user"],
+            [kind for (kind, _mat) in matches],
+        )
+        self.assertEqual("rwbl", first_match(matches, "dot_taxon")["query"])
+        self.assertEqual("3", first_match(matches, "taxon")["taxon_id"])
+        self.assertEqual("bee", first_match(matches, "user")["login"])
+
+    def test_dot_taxon_optional(self):
+        """Test `.taxon.` lookups are only matched if asked for."""
+        self.assertEqual([], scan_message("It's .rwbl. for sure."))
+        self.assertEqual([], scan_message("Hi. How are you. obs. "))
+        self.assertEqual(1, len(scan_message("It's .rwbl. for sure.", True)))
+
+    def test_dot_taxon_after_any_space(self):
+        """Test `.taxon.` lookups are matched after any whitespace."""
+        for space in (" ", "\n", "\t", "\r", "\xa0"):
+            content = f"It's{space}.rwbl. for sure."
+            matches = scan_message(content, True)
+            self.assertEqual("rwbl", first_match(matches, "dot_taxon")["query"])
+
+    def test_dot_taxon_spanning_link(self):
+        """Test links are found between dots that could be a `.taxon.`."""
+        for content in (
+            "cf .Genus species https://www.inaturalist.org/observations/77 "
+            "which is similar.",
+            "Found it .5 mi past the gate https://www.inaturalist.org/observations/123.",
+        ):
+            for dot_taxon in (False, True):
+                matches = scan_message(content, dot_taxon)
+                self.assertTrue(first_match(matches, "obs"), content)
@@ -0,0 +1,41 @@
+"""Test inatcog.settings."""
+import unittest
+from unittest.mock import MagicMock
+
+from inatcog.settings import SettingsSnapshot
+
+
+def make_channel(channel_id, guild_id):
+    """Make a channel in a guild."""
+    channel = MagicMock()
+    channel.id = channel_id
+    channel.guild.id = guild_id
+    return channel
+
+
+class TestSettingsSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.settings = SettingsSnapshot()
+        self.channel = make_channel(2, 1)
+
+    def test_channel_inherits_guild(self):
+        """Test unset channel settings inherit from the guild."""
+        self.assertFalse(self.settings.autoobs(self.channel))
+        self.settings.update_guild(1, autoobs=True)
+        self.assertTrue(self.settings.autoobs(self.channel))
+        self.settings.update_channel(2, autoobs=False)
+        self.assertFalse(self.settings.autoobs(self.channel))
+        self.settings.update_channel(2, autoobs=None)
+        self.assertTrue(self.settings.autoobs(self.channel))
+        self.assertFalse(self.settings.dot_taxon(self.channel))
+
+    def test_bot_prefixes(self):
+        """Test messages starting with other bots' prefixes are matched."""
+        message = MagicMock()
+        message.guild.id = 1
+        message.content = "!obs 1"
+        self.assertFalse(self.settings.is_bot_command(message))
+        self.settings.update_guild(1, bot_prefixes=["?", "!"])
+        self.assertTrue(self.settings.is_bot_command(message))
+        self.settings.update_guild(1, bot_prefixes=[])
+        self.assertFalse(self.settings.is_bot_command(message))
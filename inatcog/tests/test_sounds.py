@@ -0,0 +1,77 @@
+"""Test inatcog.sounds."""
+import asyncio
+from pathlib import Path
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import aiohttp
+from yarl import URL
+
+from inatcog.metrics import Metrics
+from inatcog.sounds import INatSoundCache
+
+SOUND_URL = "https://static.inaturalist.org/sounds/1.m4a"
+
+
+class FakeResponse:
+    def __init__(self, chunks, error=None):
+        self.status = 200
+        self.content_length = None
+        self.url = URL(SOUND_URL)
+        self.content = MagicMock()
+        self.content.iter_chunked = lambda _size: self._iter_chunked(chunks, error)
+
+    @staticmethod
+    async def _iter_chunked(chunks, error):
+        for chunk in chunks:
+            await asyncio.sleep(0)
+            yield chunk
+        if error:
+            raise error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_args):
+        return False
+
+
+class TestINatSoundCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cog = MagicMock()
+        self.cog.metrics = Metrics()
+        self.cache = INatSoundCache(self.cog)
+        self.cache._path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_shared_download(self):
+        """Test sounds requested at once are downloaded once."""
+        self.cog.api.session.get = MagicMock(
+            return_value=FakeResponse([b"abc", b"def"])
+        )
+
+        async def run():
+            return await asyncio.gather(
+                self.cache.get_sound(SOUND_URL), self.cache.get_sound(SOUND_URL)
+            )
+
+        (first, second) = asyncio.run(run())
+        self.assertEqual(first, second)
+        self.assertEqual(first[1], "1.mp3")
+        self.assertEqual(first[0].read_bytes(), b"abcdef")
+        self.cog.api.session.get.assert_called_once()
+        self.assertEqual(self.cog.metrics.counters["sound_cache.joined"], 1)
+        self.assertEqual(list(self.cache.path.iterdir()), [first[0]])
+
+    def test_failed_download(self):
+        """Test a failed download leaves no file behind."""
+        self.cog.api.session.get = MagicMock(
+            return_value=FakeResponse([b"abc"], aiohttp.ClientPayloadError())
+        )
+        self.assertIsNone(asyncio.run(self.cache.get_sound(SOUND_URL)))
+        self.assertEqual(list(self.cache.path.iterdir()), [])
+        self.assertEqual(self.cache._downloads, {})
@@ -1,8 +1,7 @@
 """Module to handle users."""
 import re
 from typing import AsyncIterator, Optional, Tuple
-from dataclasses import dataclass, field
-from dataclasses_json import config, DataClassJsonMixin
+from dataclasses import dataclass
 import discord
 from .api import WWW_BASE_URL, WWW_URL_PAT
 
@@ -16,15 +15,34 @@ PAT_USER_LINK = re.compile(
 
 
 @dataclass
-class User(DataClassJsonMixin):
+class User:
     """A user."""
 
-    user_id: int = field(metadata=config(field_name="id"))
+    __slots__ = (
+        "user_id",
+        "name",
+        "login",
+        "observations_count",
+        "identifications_count",
+    )
+
+    user_id: int
     name: Optional[str]
     login: str
     observations_count: int
     identifications_count: int
 
+    @classmethod
+    def from_dict(cls, record: dict):
+        """Make a user from a JSON user record."""
+        return cls(
+            record["id"],
+            record.get("name"),
+            record.get("login"),
+            record.get("observations_count"),
+            record.get("identifications_count"),
+        )
+
     def display_name(self):
         """Name to include in displays."""
         return f"{self.name} ({self.login})" if self.name else self.login
@@ -46,15 +64,8 @@ class INatUserTable:
 
     async def get_user(self, member: discord.Member, refresh_cache=False):
         """Get user for Discord member."""
-        inat_user_id = None
         user = None
-        user_config = self.cog.config.user(member)
-
-        if (
-            member.guild.id in await user_config.known_in()
-            or await user_config.known_all()
-        ):
-            inat_user_id = await user_config.inat_user_id()
+        inat_user_id = self.cog.registrations.inat_user_id(member.guild.id, member.id)
         if not inat_user_id:
             raise LookupError("iNat user not known.")
 
@@ -66,6 +77,22 @@ class INatUserTable:
 
         return user
 
+    def get_known_members(self, guild: discord.Guild) -> dict:
+        """Get iNat user id of each member of the guild known in it.
+
+        Returns
+        -------
+        dict
+            discord_id -> inat_id mapping
+        """
+        return {
+            discord_id: inat_user_id
+            for (discord_id, inat_user_id) in self.cog.registrations.guild_users(
+                guild.id
+            ).items()
+            if guild.get_member(discord_id)
+        }
+
     async def get_member_pairs(
         self, guild: discord.Guild, users
     ) -> AsyncIterator[Tuple[discord.Member, User]]:
@@ -73,28 +100,22 @@ class INatUserTable:
         yields:
             discord.Member, User
 
+        Pairs are yielded as soon as each user is resolved, so they are not
+        in the order of `users`.
+
         Parameters
         ----------
         users: dict
-            discord_id -> inat_id mapping
+            discord_id -> inat_id mapping, as from `get_known_members`
         """
 
-        for discord_id in users:
-            user_json = None
-            inat_user = None
-
+        members_by_inat_id = {}
+        for (discord_id, inat_user_id) in users.items():
             discord_member = guild.get_member(discord_id)
-            if (
-                discord_member
-                and guild.id in users[discord_id].get("known_in")
-                or users[discord_id].get("known_all")
-            ):
-                inat_user_id = users[discord_id].get("inat_user_id")
-                if inat_user_id:
-                    user_json = await self.cog.api.get_users(inat_user_id)
-            if user_json:
-                results = user_json["results"]
-                if results:
-                    inat_user = User.from_dict(results[0])
-            if discord_member and inat_user:
+            if discord_member:
+                members_by_inat_id.setdefault(inat_user_id, []).append(discord_member)
+
+        async for record in self.cog.api.get_users_by_ids(members_by_inat_id):
+            inat_user = User.from_dict(record)
+            for discord_member in members_by_inat_id.get(inat_user.user_id, []):
                 yield (discord_member, inat_user)